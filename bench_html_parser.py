@@ -0,0 +1,127 @@
+import argparse
+import random
+import time
+
+from html_parser import extract_text
+
+
+def extract_text_reference(html):
+    # The original character-by-character scanner, kept for comparison
+    text = ""
+    inside_tag = False
+    inside_script = False
+    inside_style = False
+
+    i = 0
+    while i < len(html):
+        if html[i:i+8].lower() == "<script>":
+            inside_script = True
+            i += 8
+            continue
+
+        if html[i:i+9].lower() == "</script>":
+            inside_script = False
+            i += 9
+            continue
+
+        if html[i:i+7].lower() == "<style>":
+            inside_style = True
+            i += 7
+            continue
+
+        if html[i:i+8].lower() == "</style>":
+            inside_style = False
+            i += 8
+            continue
+
+        if inside_script or inside_style:
+            i += 1
+            continue
+
+        c = html[i]
+
+        if c == "<":
+            inside_tag = True
+        elif c == ">":
+            inside_tag = False
+            text += " "
+        elif not inside_tag:
+            text += c
+
+        i += 1
+
+    lines = text.splitlines()
+    cleaned_lines = []
+
+    for line in lines:
+        line = line.strip()
+        if line:
+            cleaned_lines.append(line)
+
+    return "\n".join(cleaned_lines)
+
+
+WORDS = ["lorem", "ipsum", "dolor", "sit", "amet", "browser", "pinkie", "layout", "parser", "héllo"]
+
+
+def make_html(size, seed=0):
+    rng = random.Random(seed)
+    parts = ["<html><head><title>Bench</title><style>p { color: pink; }</style></head><body>\n"]
+    length = len(parts[0])
+
+    while length < size:
+        r = rng.random()
+        if r < 0.05:
+            block = "<script>var x = '<p>not text</p>';</script>\n"
+        elif r < 0.15:
+            block = f'<p><a href="https://example.com/{rng.randint(0, 999)}">link text</a></p>\n'
+        elif r < 0.2:
+            block = f"<h2>Heading {rng.randint(0, 99)}</h2>\n"
+        else:
+            words = " ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 40)))
+            block = f"<p class=\"body\">{words}</p>\n"
+
+        parts.append(block)
+        length += len(block)
+
+    parts.append("</body></html>\n")
+    return "".join(parts)
+
+
+def best_time(func, html, repeat):
+    best = None
+    result = None
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(html)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark html_parser.extract_text against the original scanner.")
+    parser.add_argument("--sizes", default="10000,100000,1000000,10000000", help="comma separated input sizes in bytes")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--reference-limit", type=int, default=1000000, help="skip the slow scanner above this size")
+    args = parser.parse_args()
+
+    print(f"{'size':>10}  {'original':>12}  {'linear':>12}  {'speedup':>8}  {'MB/s':>8}")
+
+    for size in (int(s) for s in args.sizes.split(",")):
+        html = make_html(size)
+        linear, result = best_time(extract_text, html, args.repeat)
+        throughput = len(html) / linear / 1e6
+
+        if size <= args.reference_limit:
+            original, expected = best_time(extract_text_reference, html, 1)
+            assert result == expected, "extract_text output changed"
+            print(f"{size:>10}  {original * 1000:>10.1f}ms  {linear * 1000:>10.1f}ms  {original / linear:>7.1f}x  {throughput:>8.1f}")
+        else:
+            print(f"{size:>10}  {'-':>12}  {linear * 1000:>10.1f}ms  {'-':>8}  {throughput:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from dom_parser import parse_html
+from fonts import AdvanceTableMetrics, FontRegistry
+from html_parser import extract_text
+from layout import LayoutEngine
+from tokenizer import title_from_tokens, tokenize
+
+
+WORDS = ["lorem", "ipsum", "dolor", "sit", "amet", "browser", "pinkie", "layout", "parser", "héllo", "🌸"]
+
+DEFAULT_SIZES = "1000,10000,100000,1000000,10000000"
+
+
+# ------------------- CORPUS -------------------
+def paragraph(rng, words):
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def make_corpus(size, seed=0):
+    # Same mix at every size: deep nesting, long paragraphs, link lists,
+    # headings and script/style blocks that must be skipped
+    rng = random.Random(seed)
+    parts = [
+        "<!DOCTYPE html>\n<html><head><title>Benchmark corpus</title>\n"
+        "<style>body { color: pink; } p > a { color: blue; }</style>\n"
+        "<script>var data = '<p>not text</p>';</script>\n"
+        "</head><body>\n"
+    ]
+    length = len(parts[0])
+
+    while length < size:
+        r = rng.random()
+
+        if r < 0.1:
+            depth = rng.randint(10, 60)
+            block = "<div>" * depth + f"<span>{paragraph(rng, 5)}</span>" + "</div>" * depth + "\n"
+        elif r < 0.3:
+            block = f"<p>{paragraph(rng, rng.randint(100, 400))}</p>\n"
+        elif r < 0.45:
+            links = "".join(
+                f'<li><a href="https://example.com/{rng.randint(0, 99999)}">{paragraph(rng, 2)}</a></li>'
+                for _ in range(rng.randint(5, 30))
+            )
+            block = f"<ul>{links}</ul>\n"
+        elif r < 0.55:
+            level = rng.choice((1, 2))
+            block = f"<h{level}>{paragraph(rng, rng.randint(2, 8))}</h{level}>\n"
+        elif r < 0.6:
+            block = f"<script type=\"text/javascript\">for (var i = 0; i < {rng.randint(1, 99)}; i++) {{ x += '<b>'; }}</script>\n"
+        elif r < 0.65:
+            block = f"<style>.c{rng.randint(0, 999)} {{ margin: 0; }}</style>\n"
+        else:
+            block = f'<p class="body">{paragraph(rng, rng.randint(10, 60))} <b>{paragraph(rng, 3)}</b></p>\n'
+
+        parts.append(block)
+        length += len(block)
+
+    parts.append("</body></html>\n")
+    return "".join(parts)
+
+
+# ------------------- BENCHMARKS -------------------
+def bench_extract_text(html):
+    return extract_text(html)
+
+
+def bench_clean_html(html):
+    return LayoutEngine(html).clean_html()
+
+
+def bench_tokenize(html):
+    count = 0
+    for _ in tokenize(html):
+        count += 1
+    return count
+
+
+def cold_metrics():
+    # A registry of its own per run, so every run measures its words
+    # instead of hitting widths cached by the run before
+    return FontRegistry(AdvanceTableMetrics())
+
+
+def bench_layout(html):
+    # Headless, so widths come from the advance-table metrics backend
+    engine = LayoutEngine(html, metrics=cold_metrics())
+    engine.parse()
+    return len(engine.display_list)
+
+
+def bench_dom_layout(html):
+    # Build the DOM, then lay out its replayed token stream
+    engine = LayoutEngine("", metrics=cold_metrics())
+    engine.layout_tokens(parse_html(html).iter_tokens())
+    return len(engine.display_list)
+
+
+def bench_extract_title(html):
+    return title_from_tokens(tokenize(html))
+
+
+BENCHMARKS = {
+    "extract_text": bench_extract_text,
+    "clean_html": bench_clean_html,
+    "tokenize": bench_tokenize,
+    "layout": bench_layout,
+    "dom_layout": bench_dom_layout,
+    "extract_title": bench_extract_title,
+}
+
+
+def time_runs(func, html, repeat, budget):
+    # Best of `repeat` runs, fewer if the budget (seconds) runs out
+    best = None
+    total = 0
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(html)
+        elapsed = time.perf_counter() - start
+
+        best = elapsed if best is None else min(best, elapsed)
+        total += elapsed
+        if total > budget:
+            break
+
+    return best
+
+
+def peak_memory(func, html):
+    # Separate run, tracemalloc slows everything down
+    tracemalloc.start()
+    try:
+        func(html)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run(names, sizes, repeat, budget, seed):
+    results = {}
+
+    for size in sizes:
+        html = make_corpus(size, seed)
+
+        for name in names:
+            func = BENCHMARKS[name]
+            best = time_runs(func, html, repeat, budget)
+            peak = peak_memory(func, html)
+
+            key = f"{name}/{size}"
+            results[key] = {
+                "benchmark": name,
+                "size": size,
+                "bytes": len(html.encode("utf-8")),
+                "seconds": best,
+                "ops_per_sec": 1 / best if best else 0.0,
+                "mb_per_sec": len(html) / best / 1e6 if best else 0.0,
+                "peak_bytes": peak,
+            }
+
+            print_result(key, results[key])
+
+    return results
+
+
+def print_result(key, result):
+    print(
+        f"{key:<28} {result['seconds'] * 1000:>10.2f}ms {result['ops_per_sec']:>10.1f} ops/s "
+        f"{result['mb_per_sec']:>8.2f} MB/s {result['peak_bytes'] / 1e6:>9.2f} MB peak"
+    )
+
+
+# ------------------- BASELINES -------------------
+def save_baseline(path, results, seed):
+    data = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "seed": seed,
+        "results": results,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+
+
+def compare(results, baseline, threshold):
+    # Slower by more than threshold, or a higher memory peak by more than threshold
+    regressions = []
+
+    for key, result in results.items():
+        old = baseline["results"].get(key)
+        if not old:
+            continue
+
+        if result["ops_per_sec"] < old["ops_per_sec"] * (1 - threshold):
+            change = result["ops_per_sec"] / old["ops_per_sec"] - 1
+            regressions.append(f"{key}: {old['ops_per_sec']:.1f} -> {result['ops_per_sec']:.1f} ops/s ({change:+.0%})")
+
+        if result["peak_bytes"] > old["peak_bytes"] * (1 + threshold):
+            change = result["peak_bytes"] / old["peak_bytes"] - 1
+            regressions.append(f"{key}: {old['peak_bytes'] / 1e6:.2f} -> {result['peak_bytes'] / 1e6:.2f} MB peak ({change:+.0%})")
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse and layout benchmarks over a synthetic HTML corpus.")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="comma separated corpus sizes in bytes")
+    parser.add_argument("--only", default=",".join(BENCHMARKS), help="comma separated benchmarks to run")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=5.0, help="stop repeating a benchmark after this many seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", metavar="PATH", help="write results as a JSON baseline")
+    parser.add_argument("--compare", metavar="PATH", help="compare against a JSON baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown / memory growth (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    names = args.only.split(",")
+    for name in names:
+        if name not in BENCHMARKS:
+            parser.error(f"unknown benchmark {name!r}, choose from {', '.join(BENCHMARKS)}")
+
+    sizes = [int(s) for s in args.sizes.split(",")]
+    results = run(names, sizes, args.repeat, args.budget, args.seed)
+
+    if args.save:
+        save_baseline(args.save, results, args.seed)
+        print(f"Saved baseline to {args.save}")
+
+    if args.compare:
+        if not os.path.exists(args.compare):
+            parser.error(f"no baseline at {args.compare}")
+
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+            for line in regressions:
+                print("  " + line)
+            sys.exit(1)
+
+        print(f"\nNo regressions beyond {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
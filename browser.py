@@ -1,14 +1,50 @@
 import tkinter as tk
 import json
 import os
-from network import request
-from layout import LayoutEngine
+import time
+from collections import deque
+from display_list import DisplayList, LinkList
+from fonts import TkMetrics, registry
+from layout import LayoutEngine, font_size
+from images import ImageLoader
+from page_loader import PageLoader
+from prefetch import Prefetcher
+from tokenizer import title_from_tokens, tokenize
 
 WIDTH, HEIGHT = 900, 650
 TOPBAR_HEIGHT = 55
 TABBAR_HEIGHT = 40
 SCROLL_STEP = 50
 
+# Extra page drawn above and below the viewport, more than a line is tall
+RENDER_OVERSCAN = 100
+
+# Canvas items are created and deleted in bands of this height
+TILE_HEIGHT = 512
+
+# Text is laid out this far short of the window width
+PAGE_MARGIN = 40
+RESIZE_DELAY_MS = 100
+
+# Scrolling draws at most one frame per FRAME_MS (~60 fps)
+FRAME_MS = 16
+
+# Ease towards the scroll target over a few frames instead of jumping
+SMOOTH_SCROLL = False
+SMOOTH_FACTOR = 0.35
+
+# Print frame timings when the browser closes
+FRAME_STATS = False
+
+# Hand cursor and target URL in the title bar over links
+HOVER_FEEDBACK = True
+
+# Speculative link prefetching (opt-in)
+PREFETCH_LINKS = False
+HOVER_PREFETCH_MS = 300
+SCROLL_PREFETCH_MS = 200
+PREFETCH_MARGIN = 300
+
 
 class Tab:
     def __init__(self, url="home://"):
@@ -16,13 +52,46 @@ class Tab:
         self.title = "New Tab 💖"
         self.scroll_y = 0
         self.page_height = 0
-        self.display_list = []
-        self.links = []
+        self.display_list = DisplayList()
+        self.links = LinkList(self.display_list)
+        self.images = []
+
+        # Measured layout of the page, reflowed when the window width changes
+        self.engine = None
 
         self.history = []
         self.history_index = -1
 
 
+class FrameTimer:
+    def __init__(self, budget_ms=FRAME_MS, keep=600):
+        self.budget = budget_ms / 1000
+
+        # Seconds spent on each of the most recent frames
+        self.times = deque(maxlen=keep)
+        self.frames = 0
+        self.over_budget = 0
+        self.worst = 0.0
+
+    def record(self, seconds):
+        self.times.append(seconds)
+        self.frames += 1
+        self.worst = max(self.worst, seconds)
+
+        if seconds > self.budget:
+            self.over_budget += 1
+
+    def stats(self):
+        recent = sorted(self.times)
+        return {
+            "frames": self.frames,
+            "over_budget": self.over_budget,
+            "avg_ms": sum(recent) / len(recent) * 1000 if recent else 0.0,
+            "p95_ms": recent[int(len(recent) * 0.95)] * 1000 if recent else 0.0,
+            "worst_ms": self.worst * 1000,
+        }
+
+
 class Browser:
     def __init__(self):
         self.window = tk.Tk()
@@ -30,6 +99,9 @@ class Browser:
         self.window.geometry(f"{WIDTH}x{HEIGHT}")
         self.window.configure(bg="#ffd6e8")
 
+        # Measure text with the real Tk fonts now that there is a root window
+        registry.use(TkMetrics())
+
         # Tabs
         self.tabs = []
         self.current_tab_index = 0
@@ -149,7 +221,8 @@ class Browser:
         self.main_frame = tk.Frame(self.window)
         self.main_frame.pack(fill="both", expand=True)
 
-        self.canvas = tk.Canvas(self.main_frame, bg="white")
+        # Items stay at page coordinates, scrolling only moves the view
+        self.canvas = tk.Canvas(self.main_frame, bg="white", confine=False)
         self.canvas.pack(side="left", fill="both", expand=True)
 
         self.scrollbar = tk.Scrollbar(self.main_frame, orient="vertical", command=self.scrollbar_move)
@@ -165,6 +238,19 @@ class Browser:
         self.loading_progress = 0
         self.loading_active = False
 
+        # Retained rendering state for the current tab
+        self.tiles = set()
+        self.drawn_images = set()
+        self.drawn_words = 0
+        self.scroll_height = 0
+
+        # Scroll events only move the target, frames catch up with it
+        self.scroll_target = None
+        self.scroll_smooth = SMOOTH_SCROLL
+        self.frame_job = None
+        self.last_frame = 0.0
+        self.frame_timer = FrameTimer()
+
         # Bindings
         self.window.bind("<MouseWheel>", self.on_scroll)
         self.window.bind("<Down>", self.scroll_down)
@@ -173,10 +259,43 @@ class Browser:
         self.url_entry.bind("<Return>", self.go_to_url)
         self.canvas.bind("<Button-1>", self.on_click)
 
+        # Reflow pages to the window width
+        self.layout_width = WIDTH - PAGE_MARGIN
+        self.resize_job = None
+        self.window.bind("<Configure>", self.on_resize)
+
+        # Background page loading
+        self.loader = PageLoader(
+            self.window,
+            self.on_load_event,
+            first_paint_height=HEIGHT - TOPBAR_HEIGHT - TABBAR_HEIGHT
+        )
+
+        # Image fetch/decode on workers, decoded images shared by all tabs
+        self.image_loader = ImageLoader(self.window, self.on_image_ready, shown=self.shown_images)
+
+        # Warm the cache for links likely to be clicked next
+        self.prefetcher = Prefetcher() if PREFETCH_LINKS else None
+        self.hover_url = None
+        self.hover_job = None
+        self.scroll_prefetch_job = None
+
+        if HOVER_FEEDBACK or self.prefetcher:
+            self.canvas.bind("<Motion>", self.on_motion)
+            self.canvas.bind("<Leave>", self.on_leave)
+
         # Start with 1 tab
         self.new_tab()
 
         self.window.mainloop()
+        self.loader.shutdown()
+        self.image_loader.shutdown()
+
+        if self.prefetcher:
+            self.prefetcher.shutdown()
+
+        if FRAME_STATS:
+            print("Frame timings:", self.frame_timer.stats())
 
     # ------------------- CURRENT TAB -------------------
     def current_tab(self):
@@ -291,15 +410,7 @@ class Browser:
         self.load_page("history://", add_to_history=False)
 
     def extract_title(self, html):
-        import re
-
-        match = re.search(r"<title>(.*?)</title>", html, re.IGNORECASE | re.DOTALL)
-        if match:
-            title = match.group(1).strip()
-            title = re.sub(r"\s+", " ", title)
-            return title
-
-        return "Untitled Page"
+        return title_from_tokens(tokenize(html))
 
     def start_loading(self):
         self.loading_active = True
@@ -337,51 +448,41 @@ class Browser:
     def load_page(self, url, add_to_history=True):
         tab = self.current_tab()
 
-        try:
-            self.start_loading()
+        # Leaving the page, so its prefetches are no longer useful
+        if self.prefetcher:
+            self.prefetcher.cancel()
 
-            if url.startswith("delete://"):
-                real_url = url.replace("delete://", "")
+        if url.startswith("delete://"):
+            real_url = url.replace("delete://", "")
 
-                if real_url in self.bookmarks:
-                    self.bookmarks.remove(real_url)
-                    self.save_bookmarks()
+            if real_url in self.bookmarks:
+                self.bookmarks.remove(real_url)
+                self.save_bookmarks()
 
-                self.load_page("home://", add_to_history=False)
-                return
-
-            if url == "home://":
-                html = self.home_page_html()
-            elif url == "history://":
-                html = self.history_page_html()
-            else:
-                html = request(url)
-
-            tab.title = self.extract_title(html)
-            self.add_to_global_history(url, tab.title)
-            engine = LayoutEngine(html)
-            tab.display_list, tab.links = engine.parse()
-
-            if tab.display_list:
-                max_y = max(item[1] for item in tab.display_list)
-                tab.page_height = max_y + 100
-            else:
-                tab.page_height = 0
+            self.load_page("home://", add_to_history=False)
+            return
 
+        if url in ("home://", "history://"):
+            # Built-in pages are small, lay them out right away
+            self.loader.cancel(tab)
             self.stop_loading()
 
-        except Exception as e:
-            tab.display_list = [(20, 20, f"❌ Error loading page:\n\n{e}", "red", False, ("Arial", 14))]
-            tab.links = []
-            tab.page_height = 0
-            self.stop_loading()
+            try:
+                if url == "home://":
+                    self.layout_page(tab, self.home_page_html())
+                else:
+                    self.layout_page(tab, self.history_page_html())
+            except Exception as e:
+                self.show_error(tab, e)
+
+            self.show_page(tab)
+            self.prefetch_visible_links()
+        else:
+            # Fetched on a worker, laid out in slices, results come back in on_load_event
+            self.start_loading()
+            self.loader.load(tab, url, self.layout_width)
 
-        tab.scroll_y = 0
         tab.url = url
-        self.window.title(f"Pinkie Browser 💖 - {tab.title}")
-
-        self.update_scrollbar()
-        self.render()
 
         if add_to_history:
             if tab.history_index < len(tab.history) - 1:
@@ -392,6 +493,127 @@ class Browser:
 
         self.refresh_tabs()
 
+    def on_load_event(self, kind, task, error):
+        tab = task.tab
+
+        if kind == "paint":
+            self.use_engine(tab, task.engine)
+            self.reflow_tab(tab)
+            self.show_page(tab)
+
+        elif kind == "progress":
+            # Another layout slice finished, the page grows downwards
+            self.update_page_height(tab)
+
+            if tab is self.current_tab():
+                self.update_scrollbar()
+                self.update_view()
+
+        elif kind == "done":
+            if tab.display_list is not task.engine.display_list:
+                self.use_engine(tab, task.engine)
+                tab.scroll_y = 0
+
+            tab.title = task.engine.title()
+            self.add_to_global_history(task.url, tab.title)
+            self.show_page(tab, reset_scroll=False)
+
+            if tab is self.current_tab():
+                self.prefetch_visible_links()
+
+        elif kind == "error":
+            self.show_error(tab, error)
+            self.show_page(tab)
+
+        if kind in ("done", "error"):
+            if not self.loader.is_loading():
+                self.stop_loading()
+            self.refresh_tabs()
+
+    def show_page(self, tab, reset_scroll=True):
+        if reset_scroll:
+            tab.scroll_y = 0
+            if tab is self.current_tab():
+                self.scroll_target = None
+
+        self.update_page_height(tab)
+
+        if tab is self.current_tab():
+            self.window.title(f"Pinkie Browser 💖 - {tab.title}")
+            self.update_scrollbar()
+            self.render()
+
+    def show_error(self, tab, e):
+        tab.display_list = DisplayList()
+        style = tab.display_list.intern("red", False, ("Arial", 14), None)
+        tab.display_list.append(20, 20, f"❌ Error loading page:\n\n{e}", 0, style)
+        tab.links = LinkList(tab.display_list)
+        tab.images = []
+        tab.engine = None
+
+    def layout_page(self, tab, html):
+        engine = LayoutEngine(html, max_width=self.layout_width)
+        engine.parse()
+        tab.title = engine.title()
+        self.use_engine(tab, engine)
+
+    def use_engine(self, tab, engine):
+        # Share the engine's lists so a page still loading keeps growing
+        tab.display_list = engine.display_list
+        tab.links = engine.links
+        tab.images = engine.images
+        tab.engine = engine
+
+    def update_page_height(self, tab):
+        # Words are laid out top to bottom, the last one is the lowest, but
+        # an image can reach further down
+        bottom = tab.display_list.y[-1] if tab.display_list else 0
+        for x, y, width, height, src, alt in tab.images:
+            bottom = max(bottom, y + height)
+
+        tab.page_height = bottom + 100 if bottom else 0
+
+    # ------------------- REFLOW -------------------
+    def on_resize(self, event):
+        if event.widget is not self.window:
+            return
+
+        width = max(event.width - PAGE_MARGIN, 100)
+        if width == self.layout_width:
+            return
+
+        self.layout_width = width
+
+        # Reflow once the user stops dragging
+        if self.resize_job:
+            self.window.after_cancel(self.resize_job)
+        self.resize_job = self.window.after(RESIZE_DELAY_MS, self.reflow_current_tab)
+
+    def reflow_current_tab(self):
+        self.resize_job = None
+        tab = self.current_tab()
+
+        if self.reflow_tab(tab):
+            self.limit_scroll()
+            self.update_scrollbar()
+            self.render()
+
+    def reflow_tab(self, tab):
+        # Other tabs are reflowed when they are switched to
+        engine = tab.engine
+        if engine is None or engine.max_width == self.layout_width:
+            return False
+
+        fraction = tab.scroll_y / tab.page_height if tab.page_height else 0
+
+        # Re-breaks lines from the measured word widths, nothing is measured again
+        engine.reflow(self.layout_width)
+        self.use_engine(tab, engine)
+        self.update_page_height(tab)
+
+        tab.scroll_y = int(fraction * tab.page_height)
+        return True
+
     # ------------------- TAB SYSTEM -------------------
     def new_tab(self):
         tab = Tab("home://")
@@ -403,6 +625,7 @@ class Browser:
     def close_tab(self, index):
         # if only one tab, don't close fully
         if len(self.tabs) == 1:
+            self.loader.cancel(self.tabs[0])
             self.tabs[0] = Tab("home://")
             self.current_tab_index = 0
             self.load_page("home://")
@@ -410,6 +633,7 @@ class Browser:
             return
 
         # delete the tab
+        self.loader.cancel(self.tabs[index])
         del self.tabs[index]
 
         # adjust current tab index
@@ -420,11 +644,15 @@ class Browser:
 
     def switch_tab(self, index):
         self.current_tab_index = index
+        self.scroll_target = None
         tab = self.current_tab()
 
         self.url_entry.delete(0, tk.END)
         self.url_entry.insert(0, tab.url)
 
+        if self.reflow_tab(tab):
+            self.limit_scroll()
+
         self.update_scrollbar()
         self.render()
         self.refresh_tabs()
@@ -494,16 +722,13 @@ class Browser:
             return
 
         if args[0] == "moveto":
+            # Dragging the thumb follows the pointer, never eases
             fraction = float(args[1])
-            tab.scroll_y = int(fraction * tab.page_height)
+            self.scroll_to(int(fraction * tab.page_height), smooth=False)
 
         elif args[0] == "scroll":
             amount = int(args[1])
-            tab.scroll_y += amount * SCROLL_STEP
-
-        self.limit_scroll()
-        self.update_scrollbar()
-        self.render()
+            self.scroll_by(amount * SCROLL_STEP)
 
     def limit_scroll(self):
         tab = self.current_tab()
@@ -512,6 +737,11 @@ class Browser:
         if tab.scroll_y < 0:
             tab.scroll_y = 0
 
+        # Lay out the region being scrolled to now instead of in a later slice
+        if self.loader.is_loading(tab):
+            self.loader.prioritize(tab, tab.scroll_y + 2 * visible_height)
+            self.update_page_height(tab)
+
         max_scroll = tab.page_height - visible_height
         if max_scroll < 0:
             max_scroll = 0
@@ -561,67 +791,279 @@ class Browser:
 
     # ------------------- RENDER -------------------
     def render(self):
-        tab = self.current_tab()
+        # Full redraw, for a new page, another tab or a reflow
         self.canvas.delete("all")
+        self.set_hover(None)
+        self.tiles = set()
+        self.drawn_images = set()
+        self.drawn_words = len(self.current_tab().display_list)
+        self.scroll_height = 0
+
+        self.update_view()
 
-        for x, y, word, color, underline, font in tab.display_list:
-            draw_y = y - tab.scroll_y
+    def update_view(self):
+        # Canvas items are kept between calls, this moves the view and only
+        # creates or deletes the tiles entering or leaving it
+        tab = self.current_tab()
+        visible_height = HEIGHT - TOPBAR_HEIGHT - TABBAR_HEIGHT
 
-            text_id = self.canvas.create_text(
-                x, draw_y,
+        # Words laid out since the last update may belong in tiles already drawn
+        if len(tab.display_list) > self.drawn_words:
+            self.invalidate_below(tab.display_list.y[self.drawn_words])
+            self.drawn_words = len(tab.display_list)
+
+        height = max(tab.page_height, visible_height)
+        if height != self.scroll_height:
+            self.scroll_height = height
+            self.canvas.configure(scrollregion=(0, 0, self.layout_width + PAGE_MARGIN, height))
+
+        self.canvas.yview_moveto(tab.scroll_y / height)
+
+        top = tab.scroll_y - RENDER_OVERSCAN
+        bottom = tab.scroll_y + visible_height + RENDER_OVERSCAN
+        tiles = set(range(max(top, 0) // TILE_HEIGHT, bottom // TILE_HEIGHT + 1))
+
+        for tile in self.tiles - tiles:
+            self.canvas.delete(f"tile-{tile}")
+
+        for tile in sorted(tiles - self.tiles):
+            self.draw_tile(tab, tile)
+
+        self.tiles = tiles
+
+        # Images can be taller than a tile, they come and go on their own
+        for index, (x, y, width, height, src, alt) in enumerate(tab.images):
+            visible = y + height >= top and y <= bottom
+
+            if visible and index not in self.drawn_images:
+                self.draw_image(tab, index)
+                self.drawn_images.add(index)
+            elif not visible and index in self.drawn_images:
+                self.canvas.delete(f"image-{index}")
+                self.drawn_images.discard(index)
+
+    def invalidate_below(self, y):
+        for tile in [tile for tile in self.tiles if (tile + 1) * TILE_HEIGHT > y]:
+            self.canvas.delete(f"tile-{tile}")
+            self.tiles.discard(tile)
+
+    def draw_tile(self, tab, tile):
+        display_list = tab.display_list
+        top = tile * TILE_HEIGHT
+        tags = ("tile", f"tile-{tile}")
+
+        first, last = display_list.band(top, top + TILE_HEIGHT - 1)
+
+        # One text item per run of same-styled words on a line
+        for x, y, text, width, color, underline, font, link in display_list.runs(first, last):
+            self.canvas.create_text(
+                x, y,
                 anchor="nw",
-                text=word,
+                text=text,
                 font=font,
-                fill=color
+                fill=color,
+                tags=tags
             )
 
             if underline:
-                bbox = self.canvas.bbox(text_id)
-                if bbox:
-                    x1, y1, x2, y2 = bbox
-                    self.canvas.create_line(x1, y2, x2, y2, fill=color)
+                # Geometry from layout, no bbox round-trip to Tk
+                line_y = y + int(font_size(font) * 1.5)
+                self.canvas.create_line(x, line_y, x + width, line_y, fill=color, tags=tags)
+
+    def draw_image(self, tab, index):
+        x, y, width, height, src, alt = tab.images[index]
+        tag = f"image-{index}"
+
+        self.canvas.delete(tag)
+        photo = self.image_loader.photo(src, width, height)
+
+        if photo:
+            self.canvas.create_image(x, y, anchor="nw", image=photo, tags=("image", tag))
+            return
+
+        # Placeholder until the picture has been fetched and decoded
+        self.canvas.create_rectangle(
+            x, y, x + width, y + height,
+            outline="#ffb3d9", fill="#fff0f7", tags=("image", tag)
+        )
+        if alt:
+            self.canvas.create_text(
+                x + 4, y + 4, anchor="nw", text=alt, width=max(width - 8, 1),
+                font=("Arial", 10), fill="#999999", tags=("image", tag)
+            )
+
+        if src.startswith(("http://", "https://")):
+            self.image_loader.request(src, width, height)
+
+    def shown_images(self):
+        tab = self.current_tab()
+        return {
+            (src, width, height)
+            for x, y, width, height, src, alt in (tab.images[index] for index in self.drawn_images)
+        }
+
+    def on_image_ready(self, key):
+        tab = self.current_tab()
+
+        # Repaint only the boxes showing this image
+        for index in list(self.drawn_images):
+            x, y, width, height, src, alt = tab.images[index]
+            if (src, width, height) == key:
+                self.draw_image(tab, index)
 
     # ------------------- LINK CLICK -------------------
+    def link_at(self, event):
+        # Indexed lookup, cheap enough to run on every mouse move. The
+        # canvas maps the pointer to the coordinates the page was drawn in
+        tab = self.current_tab()
+        return tab.links.at(self.canvas.canvasx(event.x), self.canvas.canvasy(event.y))
+
     def on_click(self, event):
+        url = self.link_at(event)
+
+        if url:
+            self.url_entry.delete(0, tk.END)
+            self.url_entry.insert(0, url)
+            self.load_page(url)
+
+    # ------------------- LINK HOVER -------------------
+    def on_motion(self, event):
+        self.set_hover(self.link_at(event))
+
+    def on_leave(self, event):
+        self.set_hover(None)
+
+    def set_hover(self, url):
+        if url == self.hover_url:
+            return
+
+        self.hover_url = url
+
+        if HOVER_FEEDBACK:
+            self.canvas.config(cursor="hand2" if url else "")
+
+            if url:
+                self.window.title(f"Pinkie Browser 💖 - {url}")
+            else:
+                self.window.title(f"Pinkie Browser 💖 - {self.current_tab().title}")
+
+        if self.prefetcher:
+            self.schedule_hover_prefetch(url)
+
+    # ------------------- PREFETCH -------------------
+    def prefetch_visible_links(self):
+        if not self.prefetcher:
+            return
+
         tab = self.current_tab()
-        click_x = event.x
-        click_y = event.y + tab.scroll_y
+        visible_height = HEIGHT - TOPBAR_HEIGHT - TABBAR_HEIGHT
+
+        # Links in and just around the viewport, found by bisection so
+        # this stays cheap after every scroll
+        top = tab.scroll_y - PREFETCH_MARGIN
+        bottom = tab.scroll_y + visible_height + PREFETCH_MARGIN
+
+        for x1, y1, x2, y2, url in tab.display_list.links(*tab.display_list.band(top, bottom)):
+            self.prefetcher.prefetch(url)
+
+        for x1, y1, x2, y2, url in tab.links.boxes:
+            if top <= y1 <= bottom:
+                self.prefetcher.prefetch(url)
+
+    def schedule_scroll_prefetch(self):
+        if self.scroll_prefetch_job:
+            self.window.after_cancel(self.scroll_prefetch_job)
+            self.scroll_prefetch_job = None
+
+        # Once scrolling has come to rest, links now in view are warmed too
+        if self.prefetcher and self.scroll_target is None:
+            self.scroll_prefetch_job = self.window.after(SCROLL_PREFETCH_MS, self.prefetch_scrolled_links)
 
-        for x1, y1, x2, y2, url in tab.links:
-            if x1 <= click_x <= x2 and y1 <= click_y <= y2:
-                self.url_entry.delete(0, tk.END)
-                self.url_entry.insert(0, url)
-                self.load_page(url)
-                return
+    def prefetch_scrolled_links(self):
+        self.scroll_prefetch_job = None
+        self.prefetch_visible_links()
+
+    def schedule_hover_prefetch(self, url):
+        if self.hover_job:
+            self.window.after_cancel(self.hover_job)
+            self.hover_job = None
+
+        # Only prefetch if the pointer rests on the link for a moment
+        if url:
+            self.hover_job = self.window.after(HOVER_PREFETCH_MS, self.prefetch_hovered_link)
+
+    def prefetch_hovered_link(self):
+        self.hover_job = None
+
+        if self.hover_url:
+            self.prefetcher.prefetch(self.hover_url)
 
     # ------------------- SCROLL EVENTS -------------------
     def on_scroll(self, event):
-        tab = self.current_tab()
-
         if event.delta < 0:
-            tab.scroll_y += SCROLL_STEP
+            self.scroll_by(SCROLL_STEP)
         else:
-            tab.scroll_y -= SCROLL_STEP
-
-        self.limit_scroll()
-        self.update_scrollbar()
-        self.render()
+            self.scroll_by(-SCROLL_STEP)
 
     def scroll_down(self, event=None):
-        tab = self.current_tab()
-        tab.scroll_y += SCROLL_STEP
-
-        self.limit_scroll()
-        self.update_scrollbar()
-        self.render()
+        self.scroll_by(SCROLL_STEP)
 
     def scroll_up(self, event=None):
+        self.scroll_by(-SCROLL_STEP)
+
+    def scroll_by(self, delta):
+        # Deltas from many events between two frames add up
+        if self.scroll_target is None:
+            self.scroll_target = self.current_tab().scroll_y
+        self.scroll_to(self.scroll_target + delta)
+
+    def scroll_to(self, y, smooth=None):
+        # The module flag is read per call, so it can be changed at runtime
+        self.scroll_target = y
+        self.scroll_smooth = SMOOTH_SCROLL if smooth is None else smooth
+        self.schedule_frame()
+        self.schedule_scroll_prefetch()
+
+    # ------------------- FRAMES -------------------
+    def schedule_frame(self):
+        if self.frame_job:
+            return
+
+        wait = self.last_frame + FRAME_MS / 1000 - time.perf_counter()
+        self.frame_job = self.window.after(max(0, int(wait * 1000)), self.draw_frame)
+
+    def draw_frame(self):
+        self.frame_job = None
+        if self.scroll_target is None:
+            return
+
+        start = time.perf_counter()
+        self.last_frame = start
         tab = self.current_tab()
-        tab.scroll_y -= SCROLL_STEP
 
+        distance = self.scroll_target - tab.scroll_y
+        if self.scroll_smooth and abs(distance) > 1:
+            step = int(distance * SMOOTH_FACTOR)
+            tab.scroll_y += step or (1 if distance > 0 else -1)
+        else:
+            tab.scroll_y = self.scroll_target
+
+        wanted = tab.scroll_y
         self.limit_scroll()
+
+        # Arrived, or stopped at the top or bottom of the page
+        if tab.scroll_y == self.scroll_target or tab.scroll_y != wanted:
+            self.scroll_target = None
+
         self.update_scrollbar()
-        self.render()
+        self.update_view()
+        self.frame_timer.record(time.perf_counter() - start)
+
+        if self.scroll_target is not None:
+            self.schedule_frame()
+        else:
+            self.schedule_scroll_prefetch()
 
 
-Browser()
+if __name__ == "__main__":
+    Browser()
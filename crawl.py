@@ -0,0 +1,213 @@
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import network
+from html_parser import extract_text
+from network import parse_url
+
+
+def init_worker():
+    # Worker processes would race on the shared cache index
+    network.cache = None
+
+
+def crawl_url(url):
+    start = time.perf_counter()
+
+    try:
+        status, headers, body = network.fetch(url)
+        text = extract_text(network.decode_body(headers, body))
+        return {
+            "url": url,
+            "status": status,
+            "bytes": len(body),
+            "seconds": time.perf_counter() - start,
+            "text": text,
+        }
+    except Exception as e:
+        return {
+            "url": url,
+            "bytes": 0,
+            "seconds": time.perf_counter() - start,
+            "error": str(e),
+        }
+
+
+def extract_file(path):
+    start = time.perf_counter()
+
+    try:
+        with open(path, "rb") as f:
+            body = f.read()
+        text = extract_text(network.decode_body({}, body))
+        return {
+            "path": path,
+            "bytes": len(body),
+            "seconds": time.perf_counter() - start,
+            "text": text,
+        }
+    except Exception as e:
+        return {
+            "path": path,
+            "bytes": 0,
+            "seconds": time.perf_counter() - start,
+            "error": str(e),
+        }
+
+
+def read_urls(path):
+    with open(path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                yield line
+
+
+def list_html_files(directory):
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith((".html", ".htm")):
+                yield os.path.join(root, name)
+
+
+def host_of(url):
+    try:
+        scheme, host, port, path = parse_url(url)
+        return host
+    except (KeyError, ValueError):
+        return url
+
+
+class HostScheduler:
+    def __init__(self, urls, per_host, delay):
+        self.per_host = per_host
+        self.delay = delay
+
+        self.queues = {}
+        for url in urls:
+            self.queues.setdefault(host_of(url), deque()).append(url)
+
+        self.in_flight = {}
+        self.last_start = {}
+
+    def next_ready(self):
+        now = time.monotonic()
+
+        for host, queue in self.queues.items():
+            if not queue:
+                continue
+            if self.in_flight.get(host, 0) >= self.per_host:
+                continue
+            if now - self.last_start.get(host, -self.delay) < self.delay:
+                continue
+
+            self.in_flight[host] = self.in_flight.get(host, 0) + 1
+            self.last_start[host] = now
+            return queue.popleft()
+
+        return None
+
+    def done(self, url):
+        self.in_flight[host_of(url)] -= 1
+
+    def pending(self):
+        return any(self.queues.values())
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+
+    # Nearest-rank percentile
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def write_result(out, result, stats):
+    out.write(json.dumps(result, ensure_ascii=False) + "\n")
+
+    stats["pages"] += 1
+    stats["bytes"] += result["bytes"]
+    stats["latencies"].append(result["seconds"])
+    if "error" in result:
+        stats["errors"] += 1
+
+
+def crawl_urls(urls, out, workers, per_host, delay, stats):
+    scheduler = HostScheduler(urls, per_host, delay)
+    running = {}
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+        while scheduler.pending() or running:
+            # Keep every worker busy with whatever the politeness rules allow
+            while len(running) < workers * 2:
+                url = scheduler.next_ready()
+                if url is None:
+                    break
+                running[pool.submit(crawl_url, url)] = url
+
+            if not running:
+                time.sleep(min(delay, 0.05))
+                continue
+
+            finished, _ = wait(running, timeout=0.05, return_when=FIRST_COMPLETED)
+            for future in finished:
+                scheduler.done(running.pop(future))
+                write_result(out, future.result(), stats)
+
+
+def extract_files(paths, out, workers, stats):
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for result in pool.map(extract_file, paths, chunksize=16):
+            write_result(out, result, stats)
+
+
+def print_report(stats, elapsed):
+    latencies = sorted(stats["latencies"])
+    elapsed = max(elapsed, 1e-9)
+
+    print(
+        f"{stats['pages']} pages ({stats['errors']} errors) in {elapsed:.2f}s: "
+        f"{stats['pages'] / elapsed:.1f} pages/s, "
+        f"{stats['bytes'] / elapsed / 1024:.1f} KB/s, "
+        f"p50 {percentile(latencies, 0.50) * 1000:.1f} ms, "
+        f"p99 {percentile(latencies, 0.99) * 1000:.1f} ms",
+        file=sys.stderr
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fetch pages and extract their text in parallel.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--urls", help="file with one URL per line")
+    source.add_argument("--html-dir", help="directory of saved .html files")
+    parser.add_argument("-o", "--output", help="JSONL output file (default: stdout)")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count() or 4)
+    parser.add_argument("--per-host", type=int, default=2, help="max concurrent requests per host")
+    parser.add_argument("--delay", type=float, default=0.5, help="min seconds between requests to one host")
+    args = parser.parse_args(argv)
+
+    out = open(args.output, "w", encoding="utf8") if args.output else sys.stdout
+    stats = {"pages": 0, "errors": 0, "bytes": 0, "latencies": []}
+    start = time.perf_counter()
+
+    try:
+        if args.urls:
+            crawl_urls(list(read_urls(args.urls)), out, args.workers, args.per_host, args.delay, stats)
+        else:
+            extract_files(list_html_files(args.html_dir), out, args.workers, stats)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    print_report(stats, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+from array import array
+from bisect import bisect_left, bisect_right
+
+
+class DisplayList:
+    def __init__(self):
+        # One entry per word in each column
+        self.x = array("i")
+        self.y = array("i")
+        self.width = array("i")
+        self.style = array("i")
+
+        # All words as UTF-8, one space apart, word i ends at ends[i]
+        self.text = bytearray()
+        self.ends = array("i")
+
+        # (color, underline, font, link), shared by every word in that style,
+        # and the width of a space after a word in that style
+        self.styles = []
+        self.spaces = array("i")
+        self.style_ids = {}
+
+    def __len__(self):
+        return len(self.x)
+
+    def intern(self, color, underline, font, link, space=0):
+        style = (color, underline, font, link)
+        style_id = self.style_ids.get(style)
+        if style_id is None:
+            style_id = len(self.styles)
+            self.styles.append(style)
+            self.spaces.append(space)
+            self.style_ids[style] = style_id
+        return style_id
+
+    def append(self, x, y, word, width, style_id):
+        self.x.append(x)
+        self.y.append(y)
+        self.width.append(width)
+        self.style.append(style_id)
+
+        if self.text:
+            self.text += b" "
+        self.text += word.encode("utf-8")
+        self.ends.append(len(self.text))
+
+    def start(self, index):
+        return self.ends[index - 1] + 1 if index else 0
+
+    def word(self, index):
+        return self.text[self.start(index):self.ends[index]].decode("utf-8")
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self.x)
+        if not 0 <= index < len(self.x):
+            raise IndexError("display list index out of range")
+
+        color, underline, font, link = self.styles[self.style[index]]
+        return (self.x[index], self.y[index], self.word(index), color, underline, font)
+
+    def __iter__(self):
+        # Same (x, y, word, color, underline, font) items as a plain list
+        return self.items(0, len(self.x))
+
+    def items(self, first, last):
+        text = self.text
+        styles = self.styles
+        start = self.start(first) if first < len(self.x) else 0
+
+        for i in range(first, last):
+            end = self.ends[i]
+            color, underline, font, link = styles[self.style[i]]
+            yield (self.x[i], self.y[i], text[start:end].decode("utf-8"), color, underline, font)
+            start = end + 1
+
+    def band(self, top, bottom):
+        # Words are laid out top to bottom, so y is sorted and the band
+        # is found by bisection instead of a scan
+        first = bisect_left(self.y, top)
+        return first, bisect_right(self.y, bottom, first)
+
+    def run_bounds(self, first, last):
+        # Words next to each other on a line, in one style and exactly a
+        # space apart, form a run
+        x = self.x
+        y = self.y
+        width = self.width
+        style = self.style
+        spaces = self.spaces
+
+        i = first
+        while i < last:
+            style_id = style[i]
+            j = i + 1
+
+            while (
+                j < last
+                and style[j] == style_id
+                and y[j] == y[i]
+                and x[j] == x[j - 1] + width[j - 1] + spaces[style_id]
+            ):
+                j += 1
+
+            yield i, j
+            i = j
+
+    def runs(self, first, last):
+        # (x, y, text, width, color, underline, font, link) per run, the
+        # text is a single slice since words are stored a space apart
+        for i, j in self.run_bounds(first, last):
+            x = self.x[i]
+            width = self.x[j - 1] + self.width[j - 1] - x
+            text = self.text[self.start(i):self.ends[j - 1]].decode("utf-8")
+            color, underline, font, link = self.styles[self.style[i]]
+
+            yield (x, self.y[i], text, width, color, underline, font, link)
+
+    def links(self, first=0, last=None):
+        # One clickable box per linked run, taken from the same columns
+        styles = self.styles
+        if last is None:
+            last = len(self.x)
+
+        for i, j in self.run_bounds(first, last):
+            link = styles[self.style[i]][3]
+            if link:
+                x = self.x[i]
+                y = self.y[i]
+                yield (x, y, self.x[j - 1] + self.width[j - 1], y + 20, link)
+
+
+class BoxIndex:
+    # Boxes added top to bottom, a point query bisects on their top edges
+    def __init__(self):
+        self.tops = array("i")
+        self.boxes = []
+        self.tallest = 0
+
+    def add(self, box):
+        self.tops.append(box[1])
+        self.boxes.append(box)
+        self.tallest = max(self.tallest, box[3] - box[1])
+
+    def truncate(self, y):
+        # Drop boxes starting at or below y
+        first = bisect_left(self.tops, y)
+        del self.tops[first:]
+        del self.boxes[first:]
+
+    def at(self, x, y):
+        first = bisect_left(self.tops, y - self.tallest)
+        last = bisect_right(self.tops, y, first)
+
+        for x1, y1, x2, y2, url in self.boxes[first:last]:
+            if x1 <= x <= x2 and y1 <= y <= y2:
+                return url
+
+        return None
+
+
+class LinkList:
+    # tab.links: linked runs from the display list, then linked images,
+    # with an index for hit-testing that follows layout as it grows
+    def __init__(self, display_list):
+        self.display_list = display_list
+        self.boxes = []
+
+        self.word_index = BoxIndex()
+        self.image_index = BoxIndex()
+        self.indexed = 0  # display list words covered by word_index
+
+    def append(self, box):
+        self.boxes.append(box)
+        self.image_index.add(box)
+
+    def clear(self):
+        # Reflow moves everything
+        self.boxes = []
+        self.word_index = BoxIndex()
+        self.image_index = BoxIndex()
+        self.indexed = 0
+
+    def __iter__(self):
+        yield from self.display_list.links()
+        yield from self.boxes
+
+    def sync(self):
+        display_list = self.display_list
+        count = len(display_list)
+        if count == self.indexed:
+            return
+
+        first = 0
+        if self.indexed:
+            # The last indexed line may have grown since, index it again
+            line_y = display_list.y[self.indexed - 1]
+            first = bisect_left(display_list.y, line_y)
+            self.word_index.truncate(line_y)
+
+        for box in display_list.links(first, count):
+            self.word_index.add(box)
+
+        self.indexed = count
+
+    def at(self, x, y):
+        self.sync()
+        return self.word_index.at(x, y) or self.image_index.at(x, y)
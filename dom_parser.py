@@ -0,0 +1,312 @@
+import re
+import sys
+from array import array
+
+from tokenizer import TAG, TEXT, Tokenizer, parse_attributes
+
+
+DOCUMENT = 0
+ELEMENT = 1
+TEXT_NODE = 2
+
+# Comments, doctype and stray closing tags, kept verbatim so a replay
+# breaks text exactly where the source did
+RAW_TAG = 3
+
+NO_NODE = -1
+
+# Elements that never have children or a closing tag
+VOID_ELEMENTS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input",
+    "link", "meta", "param", "source", "track", "wbr",
+}
+
+TAG_NAME_RE = re.compile(r"<(/?)\s*([a-zA-Z][a-zA-Z0-9:-]*)")
+
+
+def quote_attribute(value):
+    # parse_attributes reads "..." or '...' and knows no escapes, so pick
+    # the quote the value doesn't contain
+    if '"' not in value:
+        return f'"{value}"'
+    if "'" not in value:
+        return f"'{value}'"
+    return '"' + value.replace('"', "&quot;") + '"'
+
+
+class DomTree:
+    def __init__(self):
+        # One entry per node in each column, node 0 is the document
+        self.kind = array("b")
+        self.name = array("i")  # tag id for elements, index into texts for text and raw tags
+        self.parent = array("i")
+        self.first_child = array("i")
+        self.last_child = array("i")
+        self.next_sibling = array("i")
+        self.attr_start = array("i")
+        self.attr_count = array("i")
+        self.closed = array("b")  # closing tag was present in the source
+
+        # All attributes, in node order
+        self.attr_names = array("i")
+        self.attr_values = []
+
+        self.texts = []
+
+        # Interned tag and attribute names
+        self.names = []
+        self.name_ids = {}
+
+        self.add_node(DOCUMENT, self.intern("#document"), NO_NODE)
+
+    def __len__(self):
+        return len(self.kind)
+
+    def intern(self, name):
+        name_id = self.name_ids.get(name)
+        if name_id is None:
+            name_id = len(self.names)
+            self.names.append(name)
+            self.name_ids[name] = name_id
+        return name_id
+
+    def add_node(self, kind, name_id, parent):
+        node = len(self.kind)
+
+        self.kind.append(kind)
+        self.name.append(name_id)
+        self.parent.append(parent)
+        self.first_child.append(NO_NODE)
+        self.last_child.append(NO_NODE)
+        self.next_sibling.append(NO_NODE)
+        self.attr_start.append(len(self.attr_names))
+        self.attr_count.append(0)
+        self.closed.append(0)
+
+        if parent != NO_NODE:
+            last = self.last_child[parent]
+            if last == NO_NODE:
+                self.first_child[parent] = node
+            else:
+                self.next_sibling[last] = node
+            self.last_child[parent] = node
+
+        return node
+
+    def add_element(self, tag_name, attributes, parent):
+        node = self.add_node(ELEMENT, self.intern(tag_name), parent)
+
+        for name, value in attributes.items():
+            self.attr_names.append(self.intern(name))
+            self.attr_values.append(value)
+        self.attr_count[node] = len(attributes)
+
+        return node
+
+    def add_text(self, text, parent):
+        # Merge with a preceding text sibling (text split across chunks)
+        last = self.last_child[parent]
+        if last != NO_NODE and self.kind[last] == TEXT_NODE:
+            self.texts[self.name[last]] += text
+            return last
+
+        self.texts.append(text)
+        return self.add_node(TEXT_NODE, len(self.texts) - 1, parent)
+
+    def add_raw_tag(self, tag, parent):
+        self.texts.append(tag)
+        return self.add_node(RAW_TAG, len(self.texts) - 1, parent)
+
+    # ------------------- ACCESS -------------------
+    def tag_name(self, node):
+        kind = self.kind[node]
+        if kind == TEXT_NODE:
+            return "#text"
+        if kind == RAW_TAG:
+            return "#raw"
+        return self.names[self.name[node]]
+
+    def text(self, node):
+        return self.texts[self.name[node]] if self.kind[node] == TEXT_NODE else ""
+
+    def attributes(self, node):
+        start = self.attr_start[node]
+        end = start + self.attr_count[node]
+        return {
+            self.names[self.attr_names[i]]: self.attr_values[i]
+            for i in range(start, end)
+        }
+
+    def children(self, node):
+        child = self.first_child[node]
+        while child != NO_NODE:
+            yield child
+            child = self.next_sibling[child]
+
+    def walk(self, root=0):
+        # Depth-first (node, entering) pairs using the sibling links, no recursion
+        node = root
+        while True:
+            yield node, True
+
+            child = self.first_child[node]
+            if child != NO_NODE:
+                node = child
+                continue
+
+            while True:
+                yield node, False
+
+                if node == root:
+                    return
+
+                sibling = self.next_sibling[node]
+                if sibling != NO_NODE:
+                    node = sibling
+                    break
+
+                node = self.parent[node]
+
+    def find_all(self, tag_name):
+        name_id = self.name_ids.get(tag_name.lower())
+        if name_id is None:
+            return []
+        return [
+            node for node in range(len(self.kind))
+            if self.kind[node] == ELEMENT and self.name[node] == name_id
+        ]
+
+    def text_content(self, root=0):
+        return "".join(
+            self.texts[self.name[node]]
+            for node, entering in self.walk(root)
+            if entering and self.kind[node] == TEXT_NODE
+        )
+
+    def iter_tokens(self, root=0):
+        # Same token stream the tokenizer produces, for layout and text extraction
+        for node, entering in self.walk(root):
+            kind = self.kind[node]
+
+            if kind == TEXT_NODE or kind == RAW_TAG:
+                if entering:
+                    yield (TEXT if kind == TEXT_NODE else TAG, self.texts[self.name[node]])
+                continue
+
+            if kind != ELEMENT:
+                continue
+
+            name = self.names[self.name[node]]
+
+            if entering:
+                attributes = "".join(
+                    f" {key}={quote_attribute(value)}" for key, value in self.attributes(node).items()
+                )
+                yield (TAG, f"<{name}{attributes}>")
+            elif self.closed[node]:
+                yield (TAG, f"</{name}>")
+
+    def memory_bytes(self):
+        # Everything the tree keeps: the node columns plus the text,
+        # attribute value and name strings and the lists holding them
+        columns = (
+            self.kind, self.name, self.parent, self.first_child, self.last_child,
+            self.next_sibling, self.attr_start, self.attr_count, self.closed, self.attr_names,
+        )
+        total = sum(sys.getsizeof(column) for column in columns)
+
+        for strings in (self.texts, self.attr_values, self.names):
+            total += sys.getsizeof(strings) + sum(sys.getsizeof(s) for s in strings)
+
+        return total + sys.getsizeof(self.name_ids)
+
+
+class DomBuilder:
+    def __init__(self):
+        self.tree = DomTree()
+        self.tokenizer = Tokenizer()
+
+        # Open elements, innermost last
+        self.stack = [0]
+
+    def add_token(self, kind, value):
+        if kind == TEXT:
+            self.tree.add_text(value, self.stack[-1])
+            return
+
+        match = TAG_NAME_RE.match(value)
+        if not match:
+            # Comments, doctype and the like
+            self.tree.add_raw_tag(value, self.stack[-1])
+            return
+
+        closing, name = match.group(1), match.group(2).lower()
+
+        if closing:
+            # Close the nearest matching element and anything left open inside it
+            for depth in range(len(self.stack) - 1, 0, -1):
+                node = self.stack[depth]
+                if self.tree.names[self.tree.name[node]] == name:
+                    self.tree.closed[node] = 1
+                    del self.stack[depth:]
+                    break
+            else:
+                # Nothing open to close
+                self.tree.add_raw_tag(value, self.stack[-1])
+            return
+
+        node = self.tree.add_element(name, parse_attributes(value), self.stack[-1])
+
+        if name not in VOID_ELEMENTS and not value.endswith("/>"):
+            self.stack.append(node)
+
+    def feed(self, chunk):
+        for token in self.tokenizer.feed(chunk):
+            self.add_token(*token)
+
+    def close(self):
+        for token in self.tokenizer.close():
+            self.add_token(*token)
+        return self.tree
+
+
+def parse_html(html):
+    builder = DomBuilder()
+    builder.feed(html)
+    return builder.close()
+
+
+if __name__ == "__main__":
+    html = """
+    <html>
+    <head><title>DOM demo</title></head>
+    <body>
+    <h1>Hello DOM</h1>
+    <p>Some <b>bold</b> text and a <a href="https://example.com">link</a>.</p>
+    <img src="cat.png" width="100" height="80">
+    </body>
+    </html>
+    """
+
+    tree = parse_html(html)
+    depth = 0
+
+    for node, entering in tree.walk():
+        if tree.kind[node] == RAW_TAG:
+            continue
+
+        if not entering:
+            if tree.kind[node] != TEXT_NODE:
+                depth -= 1
+            continue
+
+        if tree.kind[node] == TEXT_NODE:
+            text = tree.text(node).strip()
+            if text:
+                print("  " * depth + repr(text))
+        else:
+            print("  " * depth + tree.tag_name(node), tree.attributes(node) or "")
+            depth += 1
+
+    big = parse_html("<div><p>word <a href='/x'>link</a></p></div>" * 33334)
+    print(f"{len(big)} nodes, {big.memory_bytes() / 1e6:.1f} MB retained")
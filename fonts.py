@@ -0,0 +1,225 @@
+import argparse
+import json
+import threading
+import unicodedata
+from collections import OrderedDict
+
+try:
+    import tkinter.font as tkfont
+except ImportError:
+    tkfont = None
+
+try:
+    from PIL import ImageFont
+except ImportError:
+    ImageFont = None
+
+
+# Advances of ASCII 32..126 in 1/1000 em, from the standard Helvetica metrics
+# (Arial has the same widths)
+HELVETICA = [
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+]
+
+HELVETICA_BOLD = [
+    278, 333, 474, 556, 556, 889, 722, 238, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 333, 333, 584, 584, 584, 611,
+    975, 722, 722, 722, 722, 667, 611, 778, 722, 278, 556, 722, 611, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 333, 278, 333, 584, 556,
+    333, 556, 611, 556, 611, 556, 333, 611, 611, 278, 278, 556, 278, 889, 611, 611,
+    611, 611, 389, 556, 333, 611, 556, 778, 556, 556, 500, 389, 280, 389, 584,
+]
+
+# Glyphs an advance table is generated for: ASCII and Latin-1
+TABLE_CHARS = "".join(chr(c) for c in range(32, 127)) + "".join(chr(c) for c in range(160, 256))
+
+DEFAULT_ADVANCE = 556
+WIDE_ADVANCE = 1000
+
+
+def font_weight(font):
+    return font[2] if len(font) > 2 else "normal"
+
+
+# ------------------- BACKENDS -------------------
+class TkMetrics:
+    # Exact widths from Tk, needs a Tk root window
+    def __init__(self):
+        # (family, size[, weight]) -> tkfont.Font, one per style
+        self.fonts = {}
+
+    def font(self, font):
+        font_obj = self.fonts.get(font)
+        if font_obj is None:
+            font_obj = tkfont.Font(family=font[0], size=font[1])
+            if len(font) > 2:
+                font_obj.configure(weight=font[2])
+            self.fonts[font] = font_obj
+        return font_obj
+
+    def measure(self, font, word):
+        return self.font(font).measure(word)
+
+
+class AdvanceTableMetrics:
+    # Pure Python widths from per-glyph advance tables, works headless and in
+    # worker processes
+    def __init__(self, tables=None, pixels_per_point=96 / 72):
+        self.pixels_per_point = pixels_per_point
+
+        # (family, weight) -> {char: advance in 1/1000 em}, "*" matches any family
+        self.tables = {
+            ("*", "normal"): dict(zip(TABLE_CHARS, HELVETICA)),
+            ("*", "bold"): dict(zip(TABLE_CHARS, HELVETICA_BOLD)),
+        }
+        if tables:
+            self.tables.update(tables)
+
+    def table(self, font):
+        weight = font_weight(font)
+        return (
+            self.tables.get((font[0], weight))
+            or self.tables.get(("*", weight))
+            or self.tables[("*", "normal")]
+        )
+
+    def advance(self, table, char):
+        advance = table.get(char)
+        if advance is None:
+            # Unknown glyph: CJK and emoji take a full em
+            wide = unicodedata.east_asian_width(char) in ("W", "F")
+            advance = WIDE_ADVANCE if wide else DEFAULT_ADVANCE
+        return advance
+
+    def measure(self, font, word):
+        table = self.table(font)
+        units = sum(self.advance(table, char) for char in word)
+
+        # Like Tk, negative sizes are pixels and positive ones points
+        size = font[1]
+        pixels = -size if size < 0 else size * self.pixels_per_point
+
+        return round(units * pixels / 1000)
+
+    def add_font(self, family, path, weight="normal"):
+        self.tables[(family, weight)] = advance_table(path)
+
+    def load(self, path):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        for family, weights in data.items():
+            for weight, table in weights.items():
+                self.tables[(family, weight)] = table
+
+    def save(self, path):
+        data = {}
+        for (family, weight), table in self.tables.items():
+            if family != "*":
+                data.setdefault(family, {})[weight] = table
+
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+
+
+def advance_table(path, chars=TABLE_CHARS):
+    # Generated once from a font file, then stored as JSON
+    if ImageFont is None:
+        raise RuntimeError("Pillow is needed to read font files")
+
+    font = ImageFont.truetype(path, 1000)
+    return {char: round(font.getlength(char)) for char in chars}
+
+
+def default_backend():
+    # Tk once the browser has a window, advance tables everywhere else
+    if tkfont is not None and getattr(tkfont.tkinter, "_default_root", None) is not None:
+        return TkMetrics()
+    return AdvanceTableMetrics()
+
+
+# ------------------- REGISTRY -------------------
+class FontRegistry:
+    def __init__(self, backend=None, max_widths=200000):
+        self.backend = backend
+        self.max_widths = max_widths
+
+        # (font, word) -> width in pixels, least recently used first
+        self.widths = OrderedDict()
+
+        self.width_hits = 0
+        self.width_misses = 0
+
+        # Headless backends let layout run on any thread
+        self.lock = threading.Lock()
+
+    def use(self, backend):
+        # Widths from another backend would be wrong
+        with self.lock:
+            self.backend = backend
+            self.widths = OrderedDict()
+
+    def measure(self, font, word):
+        key = (font, word)
+
+        with self.lock:
+            width = self.widths.get(key)
+            if width is not None:
+                self.width_hits += 1
+                self.widths.move_to_end(key)
+                return width
+            self.width_misses += 1
+
+            if self.backend is None:
+                self.backend = default_backend()
+            backend = self.backend
+
+        width = backend.measure(font, word)
+
+        with self.lock:
+            self.widths[key] = width
+            if len(self.widths) > self.max_widths:
+                self.widths.popitem(last=False)
+
+        return width
+
+    def clear(self):
+        with self.lock:
+            self.widths = OrderedDict()
+
+    def stats(self):
+        with self.lock:
+            lookups = self.width_hits + self.width_misses
+            return {
+                "backend": type(self.backend).__name__ if self.backend else None,
+                "widths": len(self.widths),
+                "width_hits": self.width_hits,
+                "width_misses": self.width_misses,
+                "width_hit_rate": self.width_hits / lookups if lookups else 0.0,
+            }
+
+
+# Shared by every LayoutEngine and tab
+registry = FontRegistry()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate advance tables for headless layout from font files.")
+    parser.add_argument("family", help='family name used in layout, e.g. "Arial"')
+    parser.add_argument("regular", help="regular .ttf/.otf file")
+    parser.add_argument("--bold", help="bold .ttf/.otf file")
+    parser.add_argument("-o", "--output", default="font_metrics.json")
+    args = parser.parse_args()
+
+    metrics = AdvanceTableMetrics()
+    metrics.add_font(args.family, args.regular)
+    if args.bold:
+        metrics.add_font(args.family, args.bold, weight="bold")
+
+    metrics.save(args.output)
+    print(f"Wrote {args.output}")
@@ -1,52 +1,103 @@
-def extract_text(html):
-    text = ""
-    inside_tag = False
-    inside_script = False
-    inside_style = False
-
-    i = 0
-    while i < len(html):
-
-        # Detect <script>
-        if html[i:i+8].lower() == "<script>":
-            inside_script = True
-            i += 8
-            continue
+import codecs
+import mmap
+import re
 
-        # Detect </script>
-        if html[i:i+9].lower() == "</script>":
-            inside_script = False
-            i += 9
-            continue
+from tokenizer import TEXT, Tokenizer, tokenize
 
-        # Detect <style>
-        if html[i:i+7].lower() == "<style>":
-            inside_style = True
-            i += 7
-            continue
 
-        # Detect </style>
-        if html[i:i+8].lower() == "</style>":
-            inside_style = False
-            i += 8
-            continue
+# </script> or </style> with no matching open tag is dropped without a gap
+STRAY_CLOSE_RE = re.compile(r"</(script|style)>", re.IGNORECASE)
+
+# Everything str.splitlines() breaks on
+LINE_BREAKS = "\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029"
+
 
-        # Skip script/style content
-        if inside_script or inside_style:
-            i += 1
+def lines_from_tokens(tokens):
+    # Only the line being built is held in memory
+    current = []
+
+    for kind, value in tokens:
+        if kind == TEXT:
+            # A stray ">" in text becomes a space too
+            value = value.replace(">", " ")
+        elif STRAY_CLOSE_RE.fullmatch(value):
             continue
+        else:
+            value = " "
+
+        for piece in value.splitlines(keepends=True):
+            if piece[-1] not in LINE_BREAKS:
+                current.append(piece)
+                continue
+
+            current.append(piece)
+            line = "".join(current).strip()
+            current = []
+
+            if line:
+                yield line
+
+    line = "".join(current).strip()
+    if line:
+        yield line
+
+
+def tokens_from_chunks(chunks, encoding="utf-8"):
+    tokenizer = Tokenizer()
+    decoder = None
 
-        c = html[i]
+    for chunk in chunks:
+        if not isinstance(chunk, str):
+            if decoder is None:
+                decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+            chunk = decoder.decode(chunk)
 
-        if c == "<":
-            inside_tag = True
-        elif c == ">":
-            inside_tag = False
-            text += " "
-        elif not inside_tag:
-            text += c
+        yield from tokenizer.feed(chunk)
 
-        i += 1
+    if decoder:
+        yield from tokenizer.feed(decoder.decode(b"", final=True))
+
+    yield from tokenizer.close()
+
+
+def iter_text_lines(chunks, encoding="utf-8"):
+    # Chunks may be str or bytes (e.g. a socket stream or a binary file)
+    return lines_from_tokens(tokens_from_chunks(chunks, encoding))
+
+
+def read_chunks(path, chunk_size=1024 * 1024, use_mmap=False):
+    with open(path, "rb") as f:
+        if use_mmap:
+            try:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # Empty files can't be mapped
+                return
+
+            with mapped:
+                for start in range(0, len(mapped), chunk_size):
+                    yield mapped[start:start + chunk_size]
+            return
+
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+def text_from_tokens(tokens):
+    # Same output as lines_from_tokens, but one join + splitlines is faster
+    # when the whole document is in memory anyway
+    parts = []
+
+    for kind, value in tokens:
+        if kind == TEXT:
+            parts.append(value)
+        elif not STRAY_CLOSE_RE.fullmatch(value):
+            parts.append(" ")
+
+    text = "".join(parts).replace(">", " ")
 
     # Clean output
     lines = text.splitlines()
@@ -58,3 +109,7 @@ def extract_text(html):
             cleaned_lines.append(line)
 
     return "\n".join(cleaned_lines)
+
+
+def extract_text(html):
+    return text_from_tokens(tokenize(html))
@@ -0,0 +1,343 @@
+import email.utils
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+
+# Headers that describe the connection, not the stored body.
+# Bodies are stored decoded, so the content encoding is dropped too.
+SKIP_HEADERS = {
+    "connection",
+    "keep-alive",
+    "transfer-encoding",
+    "content-length",
+    "content-encoding",
+}
+
+
+def parse_cache_control(value):
+    directives = {}
+
+    for part in value.split(","):
+        part = part.strip().lower()
+        if not part:
+            continue
+
+        if "=" in part:
+            name, arg = part.split("=", 1)
+            directives[name.strip()] = arg.strip().strip('"')
+        else:
+            directives[part] = True
+
+    return directives
+
+
+def parse_http_date(value):
+    if not value:
+        return None
+
+    try:
+        return email.utils.parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def freshness_lifetime(headers, now):
+    directives = parse_cache_control(headers.get("cache-control", ""))
+
+    if "no-cache" in directives:
+        return 0
+
+    if "max-age" in directives:
+        try:
+            return max(0, int(directives["max-age"]))
+        except ValueError:
+            return 0
+
+    date = parse_http_date(headers.get("date")) or now
+
+    if "expires" in headers:
+        expires = parse_http_date(headers["expires"])
+        return max(0, expires - date) if expires else 0
+
+    # Heuristic: 10% of the time since the page last changed, at most a day
+    last_modified = parse_http_date(headers.get("last-modified"))
+    if last_modified:
+        return min(max(0, date - last_modified) * 0.1, 86400)
+
+    return 0
+
+
+def is_storable(status, headers):
+    directives = parse_cache_control(headers.get("cache-control", ""))
+
+    if status != 200 or "no-store" in directives:
+        return False
+
+    if headers.get("vary", "").strip() == "*":
+        return False
+
+    return True
+
+
+def is_cacheable(status, headers):
+    # Storable, and worth storing: fresh for a while or revalidatable
+    if not is_storable(status, headers):
+        return False
+
+    lifetime = freshness_lifetime(headers, time.time())
+    return lifetime > 0 or "etag" in headers or "last-modified" in headers
+
+
+class CacheWriter:
+    def __init__(self, cache, url, headers):
+        self.cache = cache
+        self.url = url
+        self.headers = headers
+        self.size = 0
+
+        self.file_name = cache.file_name(url)
+        fd, self.tmp_path = tempfile.mkstemp(dir=cache.directory, suffix=".tmp")
+        self.file = os.fdopen(fd, "wb")
+
+    def write(self, data):
+        if self.file is None:
+            return
+
+        self.size += len(data)
+
+        # Too big to ever fit in the budget, stop writing
+        if self.size > self.cache.max_bytes:
+            self.abort()
+            return
+
+        try:
+            self.file.write(data)
+        except OSError:
+            # Disk full or similar, the response is still served, just not cached
+            self.abort()
+
+    def commit(self):
+        if self.file is None:
+            return
+
+        file, self.file = self.file, None
+        try:
+            file.close()
+            os.replace(self.tmp_path, os.path.join(self.cache.directory, self.file_name))
+        except OSError:
+            self.remove_tmp()
+            return
+
+        try:
+            self.cache.add_entry(self.url, self.headers, self.file_name, self.size)
+        except OSError:
+            # The entry is in memory, the index file catches up on its next save
+            pass
+
+    def abort(self):
+        if self.file is None:
+            return
+
+        file, self.file = self.file, None
+        try:
+            file.close()
+        except OSError:
+            pass
+
+        self.remove_tmp()
+
+    def remove_tmp(self):
+        try:
+            os.remove(self.tmp_path)
+        except OSError:
+            pass
+
+
+class HttpCache:
+    def __init__(self, directory="http_cache", max_bytes=50 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+        # url -> entry, least recently used first
+        self.index = OrderedDict()
+        self.total_bytes = 0
+
+        self.counts = {"hits": 0, "revalidated": 0, "misses": 0}
+
+        self.lock = threading.Lock()
+        self.load_index()
+
+    # ------------------- INDEX -------------------
+    def index_path(self):
+        return os.path.join(self.directory, "index.json")
+
+    def file_name(self, url):
+        return hashlib.sha1(url.encode("utf8")).hexdigest()
+
+    def load_index(self):
+        if not os.path.exists(self.index_path()):
+            return
+
+        try:
+            with open(self.index_path(), "r") as f:
+                entries = json.load(f)
+        except Exception:
+            entries = []
+
+        entries.sort(key=lambda entry: entry["last_used"])
+        for entry in entries:
+            self.index[entry["url"]] = entry
+            self.total_bytes += entry["size"]
+
+        # Budget may have shrunk since the index was written
+        if self.total_bytes > self.max_bytes:
+            self.evict()
+            self.save_index()
+
+    def save_index(self):
+        os.makedirs(self.directory, exist_ok=True)
+
+        tmp_path = self.index_path() + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(list(self.index.values()), f)
+        os.replace(tmp_path, self.index_path())
+
+    # ------------------- LOOKUP -------------------
+    def lookup(self, url):
+        with self.lock:
+            entry = self.index.get(url)
+            if entry is None:
+                return None
+
+            entry["last_used"] = time.time()
+            self.index.move_to_end(url)
+            return entry
+
+    def is_fresh(self, entry):
+        return time.time() < entry["expires_at"]
+
+    def validators(self, entry):
+        headers = {}
+
+        if "etag" in entry["headers"]:
+            headers["If-None-Match"] = entry["headers"]["etag"]
+        if "last-modified" in entry["headers"]:
+            headers["If-Modified-Since"] = entry["headers"]["last-modified"]
+
+        return headers
+
+    def open_body(self, entry):
+        try:
+            return open(os.path.join(self.directory, entry["file"]), "rb")
+        except OSError:
+            # Body went missing on disk, forget the entry
+            self.remove(entry["url"])
+            return None
+
+    def iter_body(self, f, chunk_size=16384):
+        with f:
+            while True:
+                data = f.read(chunk_size)
+                if not data:
+                    break
+                yield data
+
+    def record(self, outcome):
+        with self.lock:
+            self.counts[outcome] += 1
+
+    # ------------------- STORE -------------------
+    def writer(self, url, status, headers):
+        # Nothing to serve later without a lifetime or a validator
+        if not is_cacheable(status, headers):
+            self.remove(url)
+            return None
+
+        os.makedirs(self.directory, exist_ok=True)
+        return CacheWriter(self, url, headers)
+
+    def stored_headers(self, headers):
+        return {name: value for name, value in headers.items() if name not in SKIP_HEADERS}
+
+    def add_entry(self, url, headers, file_name, size):
+        now = time.time()
+        headers = self.stored_headers(headers)
+        lifetime = freshness_lifetime(headers, now)
+
+        with self.lock:
+            old = self.index.pop(url, None)
+            if old:
+                self.total_bytes -= old["size"]
+
+            self.index[url] = {
+                "url": url,
+                "headers": headers,
+                "file": file_name,
+                "size": size,
+                "expires_at": now + lifetime,
+                "last_used": now,
+            }
+            self.total_bytes += size
+
+            self.evict()
+            self.save_index()
+
+    def refresh(self, url, headers):
+        # 304 Not Modified: keep the body, update headers and lifetime
+        now = time.time()
+
+        with self.lock:
+            entry = self.index.get(url)
+            if entry is None:
+                return None
+
+            entry["headers"].update(self.stored_headers(headers))
+            entry["expires_at"] = now + freshness_lifetime(entry["headers"], now)
+            entry["last_used"] = now
+            self.index.move_to_end(url)
+
+            self.save_index()
+            return entry
+
+    def evict(self):
+        while self.total_bytes > self.max_bytes and self.index:
+            url, entry = self.index.popitem(last=False)
+            self.total_bytes -= entry["size"]
+            self.delete_file(entry)
+
+    def delete_file(self, entry):
+        try:
+            os.remove(os.path.join(self.directory, entry["file"]))
+        except OSError:
+            pass
+
+    def remove(self, url):
+        with self.lock:
+            entry = self.index.pop(url, None)
+            if entry is None:
+                return
+
+            self.total_bytes -= entry["size"]
+            self.delete_file(entry)
+            self.save_index()
+
+    def clear(self):
+        with self.lock:
+            for entry in self.index.values():
+                self.delete_file(entry)
+
+            self.index = OrderedDict()
+            self.total_bytes = 0
+            self.save_index()
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counts)
+            stats["entries"] = len(self.index)
+            stats["bytes"] = self.total_bytes
+            return stats
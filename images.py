@@ -0,0 +1,178 @@
+import io
+import queue
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from network import fetch
+
+try:
+    from PIL import Image, ImageTk
+except ImportError:
+    Image = None
+    ImageTk = None
+
+
+class ImageCache:
+    def __init__(self, max_bytes=64 * 1024 * 1024, shown=None):
+        self.max_bytes = max_bytes
+
+        # shown() gives the keys on the canvas right now, those are never
+        # evicted: dropping their PhotoImage would blank the canvas item
+        self.shown = shown
+
+        # (url, width, height) -> {"image": PIL image, "photo": PhotoImage, "size": bytes}
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key, image):
+        size = image.width * image.height * len(image.getbands())
+
+        old = self.entries.pop(key, None)
+        if old:
+            self.total_bytes -= old["size"]
+
+        self.entries[key] = {"image": image, "photo": None, "size": size}
+        self.total_bytes += size
+        self.evict(key)
+
+    def add_photo(self, key, photo):
+        # Tk keeps its own copy of the pixels, 4 bytes each
+        entry = self.entries[key]
+        entry["photo"] = photo
+
+        size = photo.width() * photo.height() * 4
+        entry["size"] += size
+        self.total_bytes += size
+        self.evict(key)
+
+    def evict(self, keep):
+        # Least recently used first, never `keep` (about to be drawn)
+        if self.total_bytes <= self.max_bytes:
+            return
+
+        shown = self.shown() if self.shown else ()
+
+        for key in list(self.entries):
+            if self.total_bytes <= self.max_bytes:
+                break
+            if key == keep or key in shown:
+                continue
+
+            evicted = self.entries.pop(key)
+            self.total_bytes -= evicted["size"]
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self.entries),
+            "bytes": self.total_bytes,
+        }
+
+
+def decode_image(data, width, height):
+    image = Image.open(io.BytesIO(data))
+
+    # Let JPEG decode straight to a smaller size when it can
+    image.draft("RGB", (width, height))
+
+    image = image.convert("RGBA")
+    image.thumbnail((width, height))
+    return image
+
+
+class ImageLoader:
+    def __init__(self, window, on_ready, workers=4, cache_bytes=64 * 1024 * 1024, poll_ms=30, shown=None):
+        self.window = window
+        self.on_ready = on_ready
+        self.poll_ms = poll_ms
+
+        # Shared by every tab
+        self.cache = ImageCache(cache_bytes, shown)
+
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.events = queue.Queue()
+
+        self.pending = set()
+        self.failed = set()
+        self.polling = False
+
+    def available(self):
+        return Image is not None
+
+    def request(self, url, width, height):
+        key = (url, width, height)
+
+        if not self.available() or key in self.pending or key in self.failed:
+            return
+        if key in self.cache.entries:
+            return
+
+        self.pending.add(key)
+        self.executor.submit(self.run, key)
+
+        if not self.polling:
+            self.polling = True
+            self.window.after(self.poll_ms, self.poll)
+
+    def photo(self, url, width, height):
+        entry = self.cache.get((url, width, height))
+        if entry is None:
+            return None
+
+        # PhotoImage must be created on the Tk thread
+        if entry["photo"] is None:
+            self.cache.add_photo((url, width, height), ImageTk.PhotoImage(entry["image"]))
+
+        return entry["photo"]
+
+    # ------------------- WORKER THREAD -------------------
+    def run(self, key):
+        url, width, height = key
+
+        try:
+            status, headers, data = fetch(url)
+            if status != 200:
+                raise ValueError(f"HTTP {status}")
+
+            self.events.put((key, decode_image(data, width, height)))
+        except Exception:
+            self.events.put((key, None))
+
+    # ------------------- TK THREAD -------------------
+    def poll(self):
+        while True:
+            try:
+                key, image = self.events.get_nowait()
+            except queue.Empty:
+                break
+
+            self.pending.discard(key)
+
+            if image is None:
+                self.failed.add(key)
+                continue
+
+            self.cache.put(key, image)
+            self.on_ready(key)
+
+        if self.pending:
+            self.window.after(self.poll_ms, self.poll)
+        else:
+            self.polling = False
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -1,102 +1,209 @@
 import re
-import tkinter.font as tkfont
+import time
+from array import array
+from bisect import bisect_right
+from itertools import accumulate
+from urllib.parse import urljoin
+
+from display_list import DisplayList, LinkList
+from fonts import registry
+from tokenizer import TEXT, TitleFinder, Tokenizer, parse_attributes
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# Box reserved for an <img> without width/height attributes
+DEFAULT_IMAGE_SIZE = (120, 90)
+
+# Measured runs recorded for reflow
+WORDS = 0
+BREAK = 1
+IMAGE = 2
+
+# Gap after an image, and between words if the font can't be measured
+SPACE_WIDTH = 8
+
+
+def font_size(font):
+    return font[1] if len(font) > 1 else 14
+
+
+def parse_size(value, default):
+    try:
+        return max(1, int(value.strip().rstrip("px")))
+    except (AttributeError, ValueError):
+        return default
 
 
 class LayoutEngine:
-    def __init__(self, html):
+    def __init__(self, html, base_url=None, max_width=860, metrics=None):
         self.html = html
-        self.display_list = []
-        self.links = []
+        self.base_url = base_url
+
+        # Anything with measure(font, word), e.g. a FontRegistry or a fonts backend
+        self.metrics = metrics or registry
+        self.display_list = DisplayList()
+        self.links = LinkList(self.display_list)
+        self.images = []
 
         self.x = 20
         self.y = 20
 
         self.line_height = 26
-        self.max_width = 860
+        self.max_width = max_width
+
+        # Tallest image on the current line
+        self.line_image_height = 0
 
         self.current_link = None
         self.current_font = ("Arial", 14)
         self.current_color = "black"
         self.current_underline = False
 
+        # Streaming state carried between feed() calls
+        self.tokenizer = Tokenizer()
+        self.pending_text = ""
+
+        # <title> picked up on the way, the tokens themselves aren't kept
+        self.title_finder = TitleFinder()
+
+        # Measure phase output, enough to break lines again at any width:
+        # runs of words (ranges of the display list, which keeps each word's
+        # width and style), breaks and images
+        self.runs = []
+
     def clean_html(self):
         html = re.sub(r"<script.*?>.*?</script>", "", self.html, flags=re.DOTALL | re.IGNORECASE)
         html = re.sub(r"<style.*?>.*?</style>", "", html, flags=re.DOTALL | re.IGNORECASE)
         return html
 
     def new_line(self, extra_space=0):
-        self.x = 20
         # Use font size to determine line height
-        font_size = self.current_font[1] if len(self.current_font) > 1 else 14
-        line_height = int(font_size * 1.5)  # 1.5x font size for good spacing
+        self.break_line(font_size(self.current_font), extra_space)
+
+    def hard_break(self, extra_space=0):
+        # Breaks from tags are kept for reflow, wrapping ones are recomputed
+        size = font_size(self.current_font)
+        self.runs.append((BREAK, size, extra_space))
+        self.break_line(size, extra_space)
+
+    def break_line(self, size, extra_space=0):
+        self.x = 20
+        line_height = int(size * 1.5)  # 1.5x font size for good spacing
+        line_height = max(line_height, self.line_image_height + 6)
+        self.line_image_height = 0
         self.y += line_height + extra_space
 
+    def space_width(self):
+        # Words are a real space apart, so a run of them can be drawn as one string
+        try:
+            return self.metrics.measure(self.current_font, " ")
+        except:
+            return SPACE_WIDTH
+
     def draw_word(self, word):
-        # Use actual Tkinter font measurement for accurate width
+        # Width from the font metrics backend (Tk in the browser),
+        # cached per (font, word) across every engine and tab
         try:
-            font_obj = tkfont.Font(family=self.current_font[0], size=self.current_font[1])
-            if len(self.current_font) > 2:
-                font_obj.configure(weight=self.current_font[2])
-            word_width = font_obj.measure(word)
+            word_width = self.metrics.measure(self.current_font, word)
         except:
             # Fallback if font measurement fails
             word_width = len(word) * 10
 
-        # Add space between words
-        space_width = 8
+        space_width = self.space_width()
 
         if self.x + word_width > self.max_width:
             self.new_line()
 
-        # Store drawing instruction
-        self.display_list.append((
-            self.x,
-            self.y,
-            word,
+        # Store drawing instruction, linked words are clickable through self.links
+        count = len(self.display_list)
+        if not self.runs or self.runs[-1][0] != WORDS:
+            self.runs.append([WORDS, count, count])
+        self.runs[-1][2] += 1
+
+        style_id = self.display_list.intern(
             self.current_color,
             self.current_underline,
-            self.current_font
-        ))
+            self.current_font,
+            self.current_link,
+            space_width
+        )
+        self.display_list.append(self.x, self.y, word, word_width, style_id)
+
+        # Add space between words
+        self.x += word_width + space_width
+
+    def draw_image(self, tag):
+        attributes = parse_attributes(tag)
+        src = attributes.get("src")
+        if not src:
+            return
+
+        if self.base_url:
+            src = urljoin(self.base_url, src)
 
-        # Store link clickable area
-        if self.current_link:
+        width = parse_size(attributes.get("width"), DEFAULT_IMAGE_SIZE[0])
+        height = parse_size(attributes.get("height"), DEFAULT_IMAGE_SIZE[1])
+        alt = attributes.get("alt", "")
+
+        run = (IMAGE, width, height, src, alt, self.current_link, font_size(self.current_font))
+        self.runs.append(run)
+        self.place_image(*run[1:])
+
+    def place_image(self, width, height, src, alt, link, size):
+        if self.x + width > self.max_width and self.x > 20:
+            self.break_line(size)
+
+        # Reserve the box now, the picture arrives later
+        self.images.append((self.x, self.y, width, height, src, alt))
+
+        if link:
             self.links.append((
                 self.x,
                 self.y,
-                self.x + word_width,
-                self.y + 20,
-                self.current_link
+                self.x + width,
+                self.y + height,
+                link
             ))
 
-        self.x += word_width + space_width
+        self.line_image_height = max(self.line_image_height, height)
+        self.x += width + SPACE_WIDTH
 
     def parse_tag(self, tag):
+        original = tag
         tag = tag.lower().strip()
 
         # Paragraph breaks
         if tag.startswith("<p") or tag.startswith("</p"):
-            self.new_line(extra_space=10)
+            self.hard_break(extra_space=10)
 
         # Line break
         elif tag.startswith("<br"):
-            self.new_line()
+            self.hard_break()
+
+        # Image
+        elif tag.startswith("<img"):
+            self.draw_image(original)
 
         # Headings
         elif tag.startswith("<h1"):
-            self.new_line(extra_space=10)
+            self.hard_break(extra_space=10)
             self.current_font = ("Arial", 22, "bold")
 
         elif tag.startswith("</h1"):
             self.current_font = ("Arial", 14)
-            self.new_line(extra_space=10)
+            self.hard_break(extra_space=10)
 
         elif tag.startswith("<h2"):
-            self.new_line(extra_space=8)
+            self.hard_break(extra_space=8)
             self.current_font = ("Arial", 18, "bold")
 
         elif tag.startswith("</h2"):
             self.current_font = ("Arial", 14)
-            self.new_line(extra_space=8)
+            self.hard_break(extra_space=8)
 
         # Bold tag
         elif tag.startswith("<b") or tag.startswith("<strong"):
@@ -119,17 +226,165 @@ class LayoutEngine:
             self.current_color = "black"
             self.current_underline = False
 
-    def parse(self):
-        html = self.clean_html()
+    def flush_text(self, keep_partial=False):
+        ends_with_space = self.pending_text[-1:].isspace()
+        words = self.pending_text.split()
+        self.pending_text = ""
+
+        # The last word may continue in the next chunk
+        if keep_partial and words and not ends_with_space:
+            self.pending_text = words.pop()
 
-        tokens = re.split(r"(<[^>]+>)", html)
+        for word in words:
+            self.draw_word(word)
 
+    def add_token(self, kind, value):
+        self.title_finder.add(kind, value)
+
+        if kind == TEXT:
+            self.pending_text += value
+        else:
+            self.flush_text()
+            self.parse_tag(value)
+
+    def feed(self, chunk):
+        for token in self.tokenizer.feed(chunk):
+            self.add_token(*token)
+
+        self.flush_text(keep_partial=True)
+        return self.display_list, self.links
+
+    def close(self):
+        for token in self.tokenizer.close():
+            self.add_token(*token)
+
+        self.flush_text()
+        return self.display_list, self.links
+
+    def parse(self):
+        self.feed(self.html)
+        return self.close()
+
+    def layout_tokens(self, tokens):
+        # Lay out an existing token stream, e.g. DomTree.iter_tokens()
         for token in tokens:
-            if token.startswith("<"):
-                self.parse_tag(token)
+            self.add_token(*token)
+
+        self.flush_text()
+        return self.display_list, self.links
+
+    def title(self):
+        return self.title_finder.title()
+
+    def run(self, tokens, deadline, until_y=None):
+        # Lay out queued tokens until the time slice is used up,
+        # but always at least down to until_y
+        count = 0
+
+        while tokens:
+            self.add_token(*tokens.popleft())
+
+            count += 1
+            if count % 32 == 0 and time.perf_counter() >= deadline:
+                if until_y is None or self.y >= until_y:
+                    break
+
+        self.flush_text(keep_partial=True)
+        return bool(tokens)
+
+    # Break phase: place the measured words again at a new width,
+    # without a single font measurement
+    def reflow(self, max_width):
+        self.max_width = max_width
+        self.x = 20
+        self.y = 20
+        self.line_image_height = 0
+
+        # Words keep their display list entries, only x/y change
+        self.links.clear()
+        self.images = []
+
+        starts, right, edges = self.word_edges()
+
+        # First word, x shift and y of every line, written out at the end
+        lines = ([], [], [])
+
+        for run in self.runs:
+            if run[0] == WORDS:
+                self.place_words(run[1], run[2], starts, right, lines)
+            elif run[0] == BREAK:
+                self.break_line(run[1], run[2])
             else:
-                words = token.split()
-                for word in words:
-                    self.draw_word(word)
+                self.place_image(*run[1:])
 
+        self.write_lines(starts, edges, lines)
         return self.display_list, self.links
+
+    def word_edges(self):
+        # One cumulative sum over the whole page, as if it were one line:
+        # word i starts at starts[i] and ends at right[i] (never decreasing),
+        # so every line is a slice of it shifted to where the line starts
+        display_list = self.display_list
+        count = len(display_list)
+
+        if numpy:
+            widths = numpy.frombuffer(display_list.width, dtype=numpy.intc).astype(numpy.int64)
+            styles = numpy.frombuffer(display_list.style, dtype=numpy.intc)
+            spaces = numpy.array(display_list.spaces, dtype=numpy.int64)[styles]
+
+            edges = numpy.zeros(count + 1, dtype=numpy.int64)
+            numpy.cumsum(widths + spaces, out=edges[1:])
+            return edges.tolist(), (edges[:-1] + widths).tolist(), edges
+
+        spaces = display_list.spaces
+        starts = [0]
+        starts.extend(accumulate(width + spaces[style_id] for width, style_id in zip(display_list.width, display_list.style)))
+        right = [start + width for start, width in zip(starts, display_list.width)]
+        return starts, right, None
+
+    def place_words(self, start, end, starts, right, lines):
+        i = start
+        wrapped = False
+
+        while i < end:
+            # First word whose right edge would pass max_width on this line
+            shift = self.x - starts[i]
+            k = bisect_right(right, self.max_width - shift, i, end)
+
+            # A word that starts a wrapped line stays there even if too wide
+            if wrapped:
+                k = max(k, i + 1)
+
+            if k > i:
+                lines[0].append(i)
+                lines[1].append(shift)
+                lines[2].append(self.y)
+                self.x = starts[k] + shift
+
+            if k == end:
+                break
+
+            font = self.display_list.styles[self.display_list.style[k]][2]
+            self.break_line(font_size(font))
+            wrapped = True
+            i = k
+
+    def write_lines(self, starts, edges, lines):
+        display_list = self.display_list
+        count = len(display_list)
+        if not count:
+            return
+
+        firsts, shifts, ys = lines
+        bounds = firsts + [count]
+
+        if edges is not None:
+            words_per_line = numpy.diff(bounds)
+            xs = numpy.frombuffer(display_list.x, dtype=numpy.intc)
+            xs[:] = edges[:-1] + numpy.repeat(shifts, words_per_line)
+            numpy.frombuffer(display_list.y, dtype=numpy.intc)[:] = numpy.repeat(ys, words_per_line)
+            return
+
+        for first, last, shift, y in zip(bounds, bounds[1:], shifts, ys):
+            display_list.x[first:last] = array("i", [start + shift for start in starts[first:last]])
+            display_list.y[first:last] = array("i", [y]) * (last - first)
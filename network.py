@@ -1,8 +1,35 @@
+import codecs
+import re
 import socket
 import ssl
+import threading
+import time
+import zlib
 
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
-def request(url):
+from http_cache import HttpCache
+from resolver import Resolver
+
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+ACCEPT_ENCODING = "gzip, deflate, br" if brotli else "gzip, deflate"
+
+# Bytes read off the socket vs bytes handed to callers after decoding
+traffic = {"wire": 0, "decoded": 0}
+
+# <meta charset="..."> or <meta http-equiv="Content-Type" content="...; charset=...">
+META_CHARSET = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([a-zA-Z0-9_:.-]+)""", re.IGNORECASE)
+
+# How much of the body to look at for a BOM or <meta charset>
+SNIFF_BYTES = 1024
+
+
+def parse_url(url):
     if url.startswith("https://"):
         scheme = "https"
         url = url[len("https://"):]
@@ -19,28 +46,589 @@ def request(url):
         host = url
         path = "/"
 
-    port = 443 if scheme == "https" else 80
+    port = DEFAULT_PORTS[scheme]
+
+    # Custom port, e.g. localhost:8000
+    if ":" in host:
+        host, port = host.rsplit(":", 1)
+        port = int(port)
+
+    return scheme, host, port, path
+
+
+class SocketReader:
+    def __init__(self, sock, size=65536):
+        self.sock = sock
+
+        # One receive buffer per connection, reused for every read
+        self.buffer = bytearray(size)
+        self.view = memoryview(self.buffer)
+        self.start = 0
+        self.end = 0
+
+    def fill(self):
+        # Move unread bytes to the front to make room
+        if self.start > 0:
+            remaining = self.end - self.start
+            self.buffer[:remaining] = self.buffer[self.start:self.end]
+            self.start = 0
+            self.end = remaining
+
+        count = self.sock.recv_into(self.view[self.end:])
+        self.end += count
+        return count
+
+    def readline(self):
+        while True:
+            newline = self.buffer.find(b"\n", self.start, self.end)
+            if newline != -1:
+                line = bytes(self.view[self.start:newline + 1])
+                self.start = newline + 1
+                return line
+
+            if self.end - self.start == len(self.buffer):
+                raise ValueError("Header line too long")
+
+            if self.fill() == 0:
+                line = bytes(self.view[self.start:self.end])
+                self.start = self.end
+                return line
+
+    def read_some(self, size):
+        # Serve what's already buffered before touching the socket
+        if self.start == self.end:
+            self.start = 0
+            self.end = self.sock.recv_into(self.view[:min(size, len(self.buffer))])
+
+        count = min(size, self.end - self.start)
+        data = bytes(self.view[self.start:self.start + count])
+        self.start += count
+        return data
+
+
+class Connection:
+    def __init__(self, scheme, host, port, resolver, ssl_context=None, session=None, timeout=30):
+        self.key = (scheme, host, port)
+        self.sock = resolver.connect(host, port)
+
+        # A stalled server fails the request instead of blocking a worker forever
+        self.sock.settimeout(timeout)
+
+        if scheme == "https":
+            try:
+                self.sock = ssl_context.wrap_socket(self.sock, server_hostname=host, session=session)
+            except Exception:
+                # Failed handshake or bad certificate, don't leak the raw socket
+                self.sock.close()
+                raise
+
+        self.reader = SocketReader(self.sock)
+        self.last_used = time.monotonic()
+        self.requests = 0
+        self.aborted = False
+
+    def session(self):
+        return getattr(self.sock, "session", None)
+
+    def close(self):
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+    def abort(self):
+        # Called from another thread, wakes up a blocked recv, which then
+        # reads the connection as closed
+        self.aborted = True
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+class ConnectionPool:
+    def __init__(self, max_per_host=6, idle_timeout=30, resolver=None, timeout=30):
+        self.max_per_host = max_per_host
+        self.idle_timeout = idle_timeout
+
+        # Seconds a send or receive may stall
+        self.timeout = timeout
+
+        # Cached DNS and IPv4/IPv6 connection racing
+        self.resolver = resolver or Resolver()
+
+        # One shared context so TLS sessions can be resumed
+        self.ssl_context = ssl.create_default_context()
+
+        self.idle = {}
+        self.open_count = {}
+        self.sessions = {}
+
+        self.hits = 0
+        self.misses = 0
+
+        self.lock = threading.Condition()
+
+    def evict_idle(self):
+        now = time.monotonic()
+
+        for key, conns in self.idle.items():
+            fresh = []
+            for conn in conns:
+                if now - conn.last_used > self.idle_timeout:
+                    conn.close()
+                    self.open_count[key] -= 1
+                else:
+                    fresh.append(conn)
+            self.idle[key] = fresh
+
+        self.lock.notify_all()
+
+    def acquire(self, scheme, host, port):
+        key = (scheme, host, port)
+
+        with self.lock:
+            self.evict_idle()
+
+            while True:
+                conns = self.idle.get(key)
+                if conns:
+                    self.hits += 1
+                    return conns.pop()
+
+                if self.open_count.get(key, 0) < self.max_per_host:
+                    self.open_count[key] = self.open_count.get(key, 0) + 1
+                    self.misses += 1
+                    session = self.sessions.get(key)
+                    break
+
+                # Per-host cap reached, wait for a connection to come back
+                self.lock.wait()
+
+        try:
+            return Connection(scheme, host, port, self.resolver, self.ssl_context, session, self.timeout)
+        except Exception:
+            with self.lock:
+                self.open_count[key] -= 1
+                self.lock.notify_all()
+            raise
+
+    def release(self, conn, reuse=True):
+        with self.lock:
+            if conn.key[0] == "https" and conn.session():
+                self.sessions[conn.key] = conn.session()
+
+            if reuse:
+                conn.last_used = time.monotonic()
+                self.idle.setdefault(conn.key, []).append(conn)
+            else:
+                conn.close()
+                self.open_count[conn.key] -= 1
+
+            self.lock.notify_all()
+
+    def close_all(self):
+        with self.lock:
+            for key, conns in self.idle.items():
+                for conn in conns:
+                    conn.close()
+                    self.open_count[key] -= 1
+            self.idle = {}
+            self.lock.notify_all()
+
+    def stats(self):
+        with self.lock:
+            idle = sum(len(conns) for conns in self.idle.values())
+            return {"hits": self.hits, "misses": self.misses, "idle": idle}
+
+
+pool = ConnectionPool()
+cache = HttpCache()
+
+
+def read_headers(conn):
+    status_line = conn.reader.readline().decode("latin-1")
+    if not status_line:
+        raise ConnectionError("Connection closed before response")
+
+    version, status, reason = (status_line.strip().split(" ", 2) + [""])[:3]
+
+    headers = {}
+    while True:
+        line = conn.reader.readline().decode("latin-1")
+        if line in ("\r\n", "\n", ""):
+            break
+        name, value = line.split(":", 1)
+        headers[name.strip().lower()] = value.strip()
+
+    return version, int(status), headers
+
+
+def iter_chunked(conn, chunk_size):
+    while True:
+        size_line = conn.reader.readline()
+        if not size_line:
+            raise ConnectionError("Connection closed inside chunked body")
+        size = int(size_line.split(b";", 1)[0].strip(), 16)
+        if size == 0:
+            break
+
+        while size > 0:
+            data = conn.reader.read_some(min(size, chunk_size))
+            if not data:
+                raise ConnectionError("Connection closed inside chunked body")
+            size -= len(data)
+            yield data
+
+        conn.reader.readline()
+
+    # Skip trailers
+    while conn.reader.readline() not in (b"\r\n", b"\n", b""):
+        pass
+
+
+def has_body(status):
+    return not (100 <= status < 200 or status in (204, 304))
+
+
+def iter_body(conn, status, headers, chunk_size=16384):
+    if not has_body(status):
+        return
+
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        yield from iter_chunked(conn, chunk_size)
+        return
+
+    if "content-length" in headers:
+        remaining = int(headers["content-length"])
+        while remaining > 0:
+            data = conn.reader.read_some(min(remaining, chunk_size))
+            if not data:
+                raise ConnectionError("Connection closed before end of body")
+            remaining -= len(data)
+            yield data
+        return
+
+    # No framing, body ends when the server closes
+    while True:
+        data = conn.reader.read_some(chunk_size)
+        if not data:
+            if conn.aborted:
+                raise ConnectionError("Connection aborted")
+            break
+        yield data
 
-    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
 
-    if scheme == "https":
-        ctx = ssl.create_default_context()
-        s = ctx.wrap_socket(s, server_hostname=host)
+class DeflateDecoder:
+    def __init__(self):
+        self.obj = None
 
-    s.connect((host, port))
+        # Start of the stream until there are two bytes to sniff
+        self.head = b""
 
-    request_data = f"GET {path} HTTP/1.0\r\nHost: {host}\r\n\r\n"
-    s.send(request_data.encode("utf8"))
+    def decompress(self, data):
+        if self.obj is None:
+            data = self.head + data
+            if len(data) < 2:
+                self.head = data
+                return b""
+            self.head = b""
 
-    response = s.makefile("r", encoding="utf8", newline="\r\n")
-    data = response.read()
+            # Servers send both zlib-wrapped and raw deflate streams
+            if data[0] & 0x0F == 8 and (data[0] << 8 | data[1]) % 31 == 0:
+                self.obj = zlib.decompressobj()
+            else:
+                self.obj = zlib.decompressobj(-zlib.MAX_WBITS)
 
-    s.close()
+        return self.obj.decompress(data)
 
-    headers, body = data.split("\r\n\r\n", 1)
-    return body
+    def flush(self):
+        return self.obj.flush() if self.obj else b""
+
+
+class BrotliDecoder:
+    def __init__(self):
+        self.obj = brotli.Decompressor()
+
+    def decompress(self, data):
+        return self.obj.process(data)
+
+    def flush(self):
+        return b""
+
+
+def decoder_for(encoding):
+    encoding = encoding.strip().lower()
+
+    if encoding in ("", "identity"):
+        return None
+    if encoding in ("gzip", "x-gzip"):
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    if encoding == "deflate":
+        return DeflateDecoder()
+    if encoding == "br" and brotli:
+        return BrotliDecoder()
+
+    raise ValueError(f"Unsupported Content-Encoding: {encoding}")
+
+
+def iter_decoded(chunks, content_encoding):
+    # Encodings are listed in the order they were applied
+    decoders = [decoder_for(e) for e in reversed(content_encoding.split(","))]
+    decoders = [d for d in decoders if d]
+
+    for data in chunks:
+        traffic["wire"] += len(data)
+
+        for decoder in decoders:
+            data = decoder.decompress(data)
+
+        if data:
+            traffic["decoded"] += len(data)
+            yield data
+
+    tail = b""
+    for decoder in decoders:
+        tail = decoder.decompress(tail) + decoder.flush()
+
+    if tail:
+        traffic["decoded"] += len(tail)
+        yield tail
+
+
+def can_reuse(version, status, headers):
+    framed = (
+        not has_body(status)
+        or headers.get("transfer-encoding", "").lower() == "chunked"
+        or "content-length" in headers
+    )
+    return (
+        framed
+        and version == "HTTP/1.1"
+        and headers.get("connection", "").lower() != "close"
+    )
+
+
+def open_response(url, extra_headers=None, watch=None):
+    # watch(conn) is told which connection the request is on, and
+    # watch(None) before that connection goes back to the pool
+    scheme, host, port, path = parse_url(url)
+
+    # The port is part of Host unless it's the scheme's default
+    host_header = host if port == DEFAULT_PORTS[scheme] else f"{host}:{port}"
+
+    header_lines = "".join(
+        f"{name}: {value}\r\n" for name, value in (extra_headers or {}).items()
+    )
+
+    # A pooled connection may have been closed by the server, retry once
+    for attempt in range(2):
+        conn = pool.acquire(scheme, host, port)
+        reused = conn.requests > 0
+        if watch:
+            watch(conn)
+
+        try:
+            request_data = (
+                f"GET {path} HTTP/1.1\r\n"
+                f"Host: {host_header}\r\n"
+                f"Connection: keep-alive\r\n"
+                f"Accept-Encoding: {ACCEPT_ENCODING}\r\n"
+                f"{header_lines}"
+                f"\r\n"
+            )
+            conn.sock.sendall(request_data.encode("utf8"))
+
+            version, status, headers = read_headers(conn)
+        except (ConnectionError, OSError, ValueError) as e:
+            if watch:
+                watch(None)
+            pool.release(conn, reuse=False)
+
+            # A timeout is a slow server, not a stale connection
+            if reused and attempt == 0 and not isinstance(e, TimeoutError):
+                continue
+            raise
+
+        conn.requests += 1
+        return conn, version, status, headers
+
+
+def read_through(conn, version, status, headers, chunk_size, writer, watch=None):
+    finished = False
+
+    chunks = iter_body(conn, status, headers, chunk_size)
+
+    try:
+        for data in iter_decoded(chunks, headers.get("content-encoding", "")):
+            if writer:
+                writer.write(data)
+            yield data
+
+        finished = True
+    finally:
+        # An abandoned body leaves unread bytes on the socket, so drop it
+        if watch:
+            watch(None)
+        pool.release(conn, reuse=finished and can_reuse(version, status, headers))
+
+        if writer:
+            if finished:
+                writer.commit()
+            else:
+                writer.abort()
+
+
+def empty_body():
+    yield from ()
+
+
+def open_url(url, chunk_size=16384, watch=None, only_cacheable=False):
+    # only_cacheable: a response the cache won't keep is dropped before its
+    # body is read (prefetching it would only download it twice)
+    entry = cache.lookup(url) if cache else None
+
+    if entry and cache.is_fresh(entry):
+        if only_cacheable:
+            # Already warm
+            return 200, entry["headers"], empty_body()
+
+        f = cache.open_body(entry)
+        if f:
+            cache.record("hits")
+            return 200, entry["headers"], cache.iter_body(f, chunk_size)
+        entry = None
+
+    validators = cache.validators(entry) if entry else None
+    conn, version, status, headers = open_response(url, validators, watch)
+
+    if status == 304 and entry:
+        if watch:
+            watch(None)
+        pool.release(conn, reuse=can_reuse(version, status, headers))
+
+        entry = cache.refresh(url, headers)
+        f = cache.open_body(entry) if entry else None
+        if f:
+            cache.record("revalidated")
+            return 200, entry["headers"], cache.iter_body(f, chunk_size)
+
+        # Cached body vanished, fetch it again unconditionally
+        cache.remove(url)
+        return open_url(url, chunk_size, watch, only_cacheable)
+
+    writer = None
+    if cache:
+        cache.record("misses")
+
+        try:
+            writer = cache.writer(url, status, headers)
+        except OSError:
+            # Unwritable cache directory, serve the response without storing it
+            writer = None
+        except Exception:
+            if watch:
+                watch(None)
+            pool.release(conn, reuse=False)
+            raise
+
+    if only_cacheable and writer is None:
+        if watch:
+            watch(None)
+        pool.release(conn, reuse=False)
+        return status, headers, empty_body()
+
+    return status, headers, read_through(conn, version, status, headers, chunk_size, writer, watch)
+
+
+def fetch(url):
+    status, headers, body = open_url(url)
+    return status, headers, b"".join(body)
+
+
+def header_charset(headers):
+    for param in headers.get("content-type", "").split(";")[1:]:
+        name, _, value = param.partition("=")
+        if name.strip().lower() == "charset":
+            return value.strip().strip("\"'")
+    return None
+
+
+def choose_charset(headers, head):
+    # A byte order mark wins over everything else
+    if head.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return "utf-16"
+
+    match = META_CHARSET.search(head[:SNIFF_BYTES])
+    meta = match.group(1).decode("ascii") if match else None
+
+    for label in (header_charset(headers), meta):
+        if not label:
+            continue
+
+        try:
+            name = codecs.lookup(label).name
+        except LookupError:
+            continue
+
+        # Browsers treat Latin-1 labels as windows-1252
+        return "cp1252" if name in ("latin-1", "iso8859-1") else name
+
+    return "utf-8"
+
+
+def decode_body(headers, body):
+    return body.decode(choose_charset(headers, body[:SNIFF_BYTES]), errors="replace")
+
+
+def stream(url, chunk_size=16384, watch=None):
+    status, headers, body = open_url(url, chunk_size, watch)
+
+    # Incremental decoder keeps multi-byte sequences split across chunks intact
+    decoder = None
+    head = b""
+
+    try:
+        for data in body:
+            if decoder is None:
+                # Hold back the start of the body until the charset is known
+                head += data
+                if len(head) < SNIFF_BYTES:
+                    continue
+
+                charset = choose_charset(headers, head)
+                decoder = codecs.getincrementaldecoder(charset)(errors="replace")
+                data = head
+
+            text = decoder.decode(data)
+            if text:
+                yield text
+
+        if decoder is None:
+            charset = choose_charset(headers, head)
+            decoder = codecs.getincrementaldecoder(charset)(errors="replace")
+            text = decoder.decode(head, final=True)
+        else:
+            text = decoder.decode(b"", final=True)
+
+        if text:
+            yield text
+    finally:
+        # Closing early (e.g. a cancelled load) gives the connection back now
+        body.close()
+
+
+def request(url):
+    status, headers, body = fetch(url)
+    return decode_body(headers, body)
 
 
 if __name__ == "__main__":
     html = request("https://example.com")
     print(html)
+    print(pool.stats())
+    print(pool.resolver.stats())
+    print(cache.stats())
+    print(traffic)
@@ -0,0 +1,189 @@
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from layout import LayoutEngine
+from network import stream
+from tokenizer import Tokenizer
+
+
+class LoadTask:
+    def __init__(self, tab, url, max_width=860):
+        self.tab = tab
+        self.url = url
+        self.engine = LayoutEngine("", base_url=url, max_width=max_width)
+
+        # Filled by the worker, drained by layout slices on the Tk thread
+        self.tokens = deque()
+        self.finished = False
+
+        self.painted = False
+        self.slice_job = None  # pending after_idle id
+        self.cancelled = threading.Event()
+
+        # Connection the worker is reading from, closed on cancel so a
+        # stalled read doesn't hold the worker
+        self.conn = None
+        self.lock = threading.Lock()
+
+    def watch(self, conn):
+        with self.lock:
+            self.conn = conn
+            if conn and self.is_cancelled():
+                conn.abort()
+
+    def cancel(self):
+        self.cancelled.set()
+
+        with self.lock:
+            if self.conn:
+                self.conn.abort()
+
+    def is_cancelled(self):
+        return self.cancelled.is_set()
+
+
+class PageLoader:
+    def __init__(self, window, on_event, first_paint_height, workers=4, poll_ms=30, slice_ms=8):
+        self.window = window
+        self.on_event = on_event
+        self.first_paint_height = first_paint_height
+        self.poll_ms = poll_ms
+        self.slice_ms = slice_ms
+
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.events = queue.Queue()
+
+        # tab -> LoadTask currently loading into it
+        self.active = {}
+        self.polling = False
+
+    def load(self, tab, url, max_width=860):
+        # A new navigation supersedes whatever the tab was loading
+        self.cancel(tab)
+
+        task = LoadTask(tab, url, max_width)
+        self.active[tab] = task
+        self.executor.submit(self.run, task)
+
+        self.schedule_poll()
+        return task
+
+    def cancel(self, tab):
+        task = self.active.pop(tab, None)
+        if task:
+            task.cancel()
+
+    def is_loading(self, tab=None):
+        if tab is None:
+            return bool(self.active)
+        return tab in self.active
+
+    # ------------------- WORKER THREAD -------------------
+    def run(self, task):
+        # Fetch and tokenize only, layout needs Tk and happens on its thread
+        try:
+            tokenizer = Tokenizer()
+            body = stream(task.url, watch=task.watch)
+
+            try:
+                for chunk in body:
+                    if task.is_cancelled():
+                        return
+
+                    task.tokens.extend(tokenizer.feed(chunk))
+                    self.events.put(("data", task, None))
+            finally:
+                body.close()
+
+            task.tokens.extend(tokenizer.close())
+            self.events.put(("eof", task, None))
+
+        except Exception as e:
+            self.events.put(("error", task, e))
+
+    # ------------------- TK THREAD -------------------
+    def schedule_poll(self):
+        if not self.polling:
+            self.polling = True
+            self.window.after(self.poll_ms, self.poll)
+
+    def poll(self):
+        while True:
+            try:
+                kind, task, error = self.events.get_nowait()
+            except queue.Empty:
+                break
+
+            # Superseded or cancelled navigation
+            if self.active.get(task.tab) is not task:
+                continue
+
+            if kind == "error":
+                del self.active[task.tab]
+                self.on_event("error", task, error)
+                continue
+
+            if kind == "eof":
+                task.finished = True
+
+            self.schedule_slice(task)
+
+        if self.active:
+            self.window.after(self.poll_ms, self.poll)
+        else:
+            self.polling = False
+
+    def schedule_slice(self, task):
+        if task.slice_job is None:
+            task.slice_job = self.window.after_idle(self.layout_slice, task)
+
+    def layout_slice(self, task, until_y=None):
+        task.slice_job = None
+
+        if self.active.get(task.tab) is not task:
+            return
+
+        # The first viewport (or the region scrolled to) is laid out in one go
+        # and shown right away, the rest continues in short slices
+        if not task.painted:
+            until_y = self.first_paint_height
+
+        if until_y is None:
+            deadline = time.perf_counter() + self.slice_ms / 1000
+        else:
+            deadline = 0
+        engine = task.engine
+        old_y = engine.y
+        more = engine.run(task.tokens, deadline, until_y)
+
+        if more:
+            self.schedule_slice(task)
+
+        if not task.painted and (engine.y > self.first_paint_height or (task.finished and not more)):
+            task.painted = True
+            self.on_event("paint", task, None)
+        elif task.painted and engine.y != old_y:
+            self.on_event("progress", task, None)
+
+        if task.finished and not more:
+            engine.close()
+            del self.active[task.tab]
+            self.on_event("done", task, None)
+
+    def prioritize(self, tab, y):
+        # The user is heading into a region that isn't laid out yet
+        task = self.active.get(tab)
+        if task and task.painted and task.engine.y < y and task.tokens:
+            # Run the pending slice now instead of starting a second chain
+            if task.slice_job is not None:
+                self.window.after_cancel(task.slice_job)
+                task.slice_job = None
+            self.layout_slice(task, until_y=y)
+
+    def shutdown(self):
+        for tab in list(self.active):
+            self.cancel(tab)
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,90 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from network import open_url
+
+
+class Prefetcher:
+    def __init__(self, max_concurrent=2, byte_budget=2 * 1024 * 1024):
+        self.byte_budget = byte_budget
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrent)
+
+        # Bumped on every navigation so queued and running jobs give up
+        self.generation = 0
+        self.seen = set()
+        self.bytes_used = 0
+
+        self.started = 0
+        self.completed = 0
+        self.cancelled = 0
+
+        self.lock = threading.Lock()
+
+    def prefetch(self, url):
+        if not url.startswith(("http://", "https://")):
+            return False
+
+        with self.lock:
+            if url in self.seen or self.bytes_used >= self.byte_budget:
+                return False
+
+            self.seen.add(url)
+            generation = self.generation
+
+        self.executor.submit(self.run, url, generation)
+        return True
+
+    def cancel(self):
+        with self.lock:
+            self.generation += 1
+            self.seen = set()
+            self.bytes_used = 0
+
+    def is_current(self, generation):
+        with self.lock:
+            return generation == self.generation and self.bytes_used < self.byte_budget
+
+    # ------------------- WORKER THREAD -------------------
+    def run(self, url, generation):
+        if not self.is_current(generation):
+            return
+
+        with self.lock:
+            self.started += 1
+
+        try:
+            status, headers, body = open_url(url, only_cacheable=True)
+
+            # Reading the body is what fills the HTTP cache, responses it
+            # wouldn't keep come back empty
+            try:
+                for data in body:
+                    with self.lock:
+                        self.bytes_used += len(data)
+
+                    if not self.is_current(generation):
+                        with self.lock:
+                            self.cancelled += 1
+                        return
+            finally:
+                body.close()
+
+            with self.lock:
+                self.completed += 1
+
+        except Exception:
+            # Prefetching is best effort, the real navigation will report errors
+            pass
+
+    def shutdown(self):
+        self.cancel()
+        self.executor.shutdown(wait=False)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "started": self.started,
+                "completed": self.completed,
+                "cancelled": self.cancelled,
+                "bytes_used": self.bytes_used,
+            }
@@ -0,0 +1,195 @@
+import errno
+import os
+import selectors
+import socket
+import threading
+import time
+
+
+class Latency:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.worst = 0.0
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.worst = max(self.worst, seconds)
+
+    def summary(self):
+        average = self.total / self.count if self.count else 0.0
+        return {
+            "count": self.count,
+            "avg_ms": round(average * 1000, 2),
+            "max_ms": round(self.worst * 1000, 2),
+        }
+
+
+def interleave(addresses):
+    # Alternate address families, IPv6 first (RFC 8305 section 4)
+    v6 = [a for a in addresses if a[0] == socket.AF_INET6]
+    other = [a for a in addresses if a[0] != socket.AF_INET6]
+
+    result = []
+    while v6 or other:
+        if v6:
+            result.append(v6.pop(0))
+        if other:
+            result.append(other.pop(0))
+
+    return result
+
+
+class Resolver:
+    def __init__(self, ttl=60, max_entries=256, attempt_delay=0.25, timeout=30):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.attempt_delay = attempt_delay
+        self.timeout = timeout
+
+        # (host, port) -> (expires_at, addresses)
+        self.cache = {}
+        self.lock = threading.Lock()
+
+        self.cache_hits = 0
+        self.resolve_latency = Latency()
+        self.connect_latency = Latency()
+
+    # ------------------- DNS -------------------
+    def resolve(self, host, port):
+        key = (host, port)
+        now = time.monotonic()
+
+        with self.lock:
+            cached = self.cache.get(key)
+            if cached and cached[0] > now:
+                self.cache_hits += 1
+                return cached[1]
+
+        start = time.monotonic()
+        addresses = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        elapsed = time.monotonic() - start
+
+        with self.lock:
+            self.resolve_latency.add(elapsed)
+
+            if len(self.cache) >= self.max_entries:
+                # Drop whichever entry expires first
+                oldest = min(self.cache, key=lambda k: self.cache[k][0])
+                del self.cache[oldest]
+
+            self.cache[key] = (time.monotonic() + self.ttl, addresses)
+
+        return addresses
+
+    def forget(self, host, port):
+        with self.lock:
+            self.cache.pop((host, port), None)
+
+    # ------------------- CONNECT -------------------
+    def connect(self, host, port):
+        addresses = interleave(self.resolve(host, port))
+
+        start = time.monotonic()
+        try:
+            sock = self.race(addresses)
+        except OSError:
+            # Cached addresses may have gone stale
+            self.forget(host, port)
+            raise
+
+        with self.lock:
+            self.connect_latency.add(time.monotonic() - start)
+
+        return sock
+
+    def race(self, addresses):
+        selector = selectors.DefaultSelector()
+        pending = list(addresses)
+        attempts = {}
+        last_error = None
+
+        deadline = time.monotonic() + self.timeout
+        next_start = time.monotonic()
+
+        try:
+            while pending or attempts:
+                now = time.monotonic()
+                if now >= deadline:
+                    raise TimeoutError(f"Connection timed out after {self.timeout}s")
+
+                # Start the next attempt if the last one is taking too long
+                if pending and (now >= next_start or not attempts):
+                    family, type_, proto, _, address = pending.pop(0)
+
+                    # e.g. an IPv6 address on a host without IPv6, move on
+                    # to the next address
+                    try:
+                        sock = socket.socket(family, type_, proto)
+                    except OSError as e:
+                        last_error = e
+                        continue
+
+                    try:
+                        sock.setblocking(False)
+                        err = sock.connect_ex(address)
+                    except OSError as e:
+                        last_error = e
+                        sock.close()
+                        continue
+
+                    if err in (0, errno.EINPROGRESS, errno.EWOULDBLOCK):
+                        selector.register(sock, selectors.EVENT_WRITE)
+                        attempts[sock] = address
+                        next_start = now + self.attempt_delay
+                    else:
+                        last_error = OSError(err, os.strerror(err))
+                        sock.close()
+                    continue
+
+                wait = deadline - now
+                if pending:
+                    wait = min(wait, next_start - now)
+
+                for key, _ in selector.select(max(wait, 0)):
+                    sock = key.fileobj
+                    selector.unregister(sock)
+                    del attempts[sock]
+
+                    err = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                    if err == 0:
+                        # Blocking again, but a stalled peer can't hang a read forever
+                        sock.settimeout(self.timeout)
+                        return sock
+
+                    # Failed early, no need to wait for the delay
+                    last_error = OSError(err, os.strerror(err))
+                    sock.close()
+                    next_start = time.monotonic()
+
+            raise last_error or OSError("No addresses to connect to")
+        finally:
+            for sock in attempts:
+                sock.close()
+            selector.close()
+
+    def stats(self):
+        with self.lock:
+            return {
+                "cached_hosts": len(self.cache),
+                "cache_hits": self.cache_hits,
+                "resolve": self.resolve_latency.summary(),
+                "connect": self.connect_latency.summary(),
+            }
+
+
+if __name__ == "__main__":
+    resolver = Resolver()
+
+    for i in range(2):
+        sock = resolver.connect("example.com", 80)
+        print(sock.getpeername())
+        sock.close()
+
+    print(resolver.stats())
@@ -0,0 +1,59 @@
+import unittest
+
+from bench_suite import make_corpus
+from dom_parser import parse_html
+from fonts import AdvanceTableMetrics, FontRegistry
+from html_parser import extract_text, text_from_tokens
+from layout import LayoutEngine
+from tokenizer import parse_attributes
+
+
+PAGES = [
+    '<h1>Title</h1><p>Some <b>bold</b> text and <a href="/x">a link</a>.</p>',
+    '<p>one<!-- note -->two</p><br><img src="cat.png" width="100" height="80" alt="a cat"> after',
+    "<div><p>unclosed <b>bold<div>nested</div> tail</p></div><ul><li>a<li>b</ul>",
+    "<!DOCTYPE html><p>stray</i>close</p></p>x</h1>y",
+    "<p><img alt='say \"hi\"' src=q> <img alt=\"it's\" src=\"r.png\" width=\"30\"></p>",
+]
+
+
+def layout(html=None, tokens=None):
+    # Headless widths, and a registry of its own so nothing is shared
+    engine = LayoutEngine(html or "", metrics=FontRegistry(AdvanceTableMetrics()))
+    if tokens is None:
+        engine.parse()
+    else:
+        engine.layout_tokens(tokens)
+    return list(engine.display_list), sorted(engine.links, key=repr), engine.images, engine.title()
+
+
+class DomTreeTest(unittest.TestCase):
+    def test_layout_from_tree_matches_layout_from_html(self):
+        for html in PAGES + [make_corpus(200000, seed=3)]:
+            tree = parse_html(html)
+            self.assertEqual(layout(tokens=tree.iter_tokens()), layout(html), html[:80])
+
+    def test_text_from_tree_matches_text_from_html(self):
+        for html in PAGES + [make_corpus(200000, seed=3)]:
+            tree = parse_html(html)
+            self.assertEqual(text_from_tokens(tree.iter_tokens()), extract_text(html), html[:80])
+
+    def test_attribute_quotes_survive_replay(self):
+        tree = parse_html("<img alt='say \"hi\"' src=q><img alt=\"it's\" src=r>")
+
+        tags = [value for kind, value in tree.iter_tokens()]
+        self.assertEqual(parse_attributes(tags[0]), {"alt": 'say "hi"', "src": "q"})
+        self.assertEqual(parse_attributes(tags[1]), {"alt": "it's", "src": "r"})
+
+    def test_comments_and_stray_closing_tags_are_kept(self):
+        tree = parse_html("<p>one<!-- note -->two</i>three</p>")
+        p = tree.find_all("p")[0]
+        self.assertEqual(
+            [tree.tag_name(node) for node in tree.children(p)],
+            ["#text", "#raw", "#text", "#raw", "#text"],
+        )
+        self.assertEqual(tree.text_content(), "onetwothree")
+
+
+if __name__ == "__main__":
+    unittest.main()
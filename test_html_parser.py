@@ -0,0 +1,82 @@
+import random
+import unittest
+
+from bench_html_parser import extract_text_reference
+from html_parser import extract_text, iter_text_lines
+
+
+# Markup both scanners read the same way: tags without "<" or ">" inside,
+# <script>/<style> without attributes and nothing else skippable inside them
+TEXT = ["a", "b c", "héllo", " ", "\n", "\r\n", '"', "'", ">", "x>y", "🌸"]
+TAGS = ["<p>", "</p>", "<b>", "</b>", '<a href="x">', "</a>", "<br/>", "<!-- note -->", "<h1 class=t>", "</script>", "</style>"]
+SKIPPED = ["<script>", "<SCRIPT>", "<style>", "<Style>"]
+
+
+def random_html(rng):
+    parts = []
+    count = rng.randint(1, 12)
+
+    for i in range(count):
+        r = rng.random()
+        if r < 0.5:
+            parts.append(rng.choice(TEXT))
+        elif r < 0.85:
+            parts.append(rng.choice(TAGS))
+        else:
+            opener = rng.choice(SKIPPED)
+            content = "".join(rng.choice(TEXT + TAGS[:6]) for _ in range(rng.randint(0, 4)))
+
+            # The last one is sometimes left open until the end of the document
+            closer = "" if i == count - 1 and rng.random() < 0.3 else f"</{opener[1:-1]}>"
+            parts.append(opener + content + closer)
+
+    # An unterminated tag at the very end
+    if rng.random() < 0.1:
+        parts.append("<p class=")
+
+    return "".join(parts)
+
+
+class ExtractTextTest(unittest.TestCase):
+    def test_same_output_as_original_scanner(self):
+        rng = random.Random(0)
+
+        for _ in range(5000):
+            html = random_html(rng)
+            self.assertEqual(extract_text(html), extract_text_reference(html), repr(html))
+
+    def test_streaming_lines_match(self):
+        rng = random.Random(1)
+
+        for _ in range(1000):
+            html = random_html(rng)
+            chunks = [html[i:i + 7] for i in range(0, len(html), 7)]
+            self.assertEqual("\n".join(iter_text_lines(chunks)), extract_text(html), repr(html))
+
+    # Intended differences from the original scanner
+
+    def test_script_and_style_with_attributes_are_skipped(self):
+        html = '<script type="text/javascript">var x;</script>a<style media="print">p {}</style>b'
+        self.assertEqual(extract_text(html), "ab")
+        self.assertEqual(extract_text_reference(html), "var x;a p {}b")
+
+    def test_skipped_content_ends_only_at_its_own_close_tag(self):
+        html = "<script>if (a <style> b)</script>c</style>d"
+        self.assertEqual(extract_text(html), "cd")
+        self.assertEqual(extract_text_reference(html), "d")
+
+    def test_stray_open_bracket_before_script(self):
+        html = "a<<script>x</script>b<p>c"
+        self.assertEqual(extract_text(html), "a b c")
+        self.assertEqual(extract_text_reference(html), "a c")
+
+    def test_first_close_bracket_ends_a_tag(self):
+        # Neither scanner reads quoted attribute values, the original also
+        # reacted to script/style tags written inside them
+        html = '<p title="</script>">x</p>'
+        self.assertEqual(extract_text(html), '" x')
+        self.assertEqual(extract_text_reference(html), "x")
+
+
+if __name__ == "__main__":
+    unittest.main()
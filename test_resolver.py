@@ -0,0 +1,82 @@
+import errno
+import socket
+import unittest
+from unittest import mock
+
+import resolver
+from resolver import Resolver
+
+
+def address(family, host, port):
+    sockaddr = (host, port, 0, 0) if family == socket.AF_INET6 else (host, port)
+    return (family, socket.SOCK_STREAM, socket.IPPROTO_TCP, "", sockaddr)
+
+
+class ResolverTest(unittest.TestCase):
+    def setUp(self):
+        self.listener = socket.socket()
+        self.listener.bind(("127.0.0.1", 0))
+        self.listener.listen(8)
+        self.port = self.listener.getsockname()[1]
+
+        # Bound but not listening, connecting to it is refused
+        self.dead = socket.socket()
+        self.dead.bind(("127.0.0.1", 0))
+        self.dead_port = self.dead.getsockname()[1]
+
+    def tearDown(self):
+        self.listener.close()
+        self.dead.close()
+
+    def test_dead_address_falls_through_to_live_listener(self):
+        addresses = [
+            address(socket.AF_INET, "127.0.0.1", self.dead_port),
+            address(socket.AF_INET, "127.0.0.1", self.port),
+        ]
+
+        sock = Resolver(attempt_delay=5).race(addresses)
+        try:
+            self.assertEqual(sock.getpeername(), ("127.0.0.1", self.port))
+        finally:
+            sock.close()
+
+    def test_unsupported_family_is_skipped(self):
+        real_socket = socket.socket
+
+        def no_ipv6(family=socket.AF_INET, *args):
+            if family == socket.AF_INET6:
+                raise OSError(errno.EAFNOSUPPORT, "Address family not supported by protocol")
+            return real_socket(family, *args)
+
+        addresses = [
+            address(socket.AF_INET6, "::1", self.port),
+            address(socket.AF_INET, "127.0.0.1", self.port),
+        ]
+
+        with mock.patch.object(resolver.socket, "socket", no_ipv6):
+            sock = Resolver().race(addresses)
+        try:
+            self.assertEqual(sock.getpeername(), ("127.0.0.1", self.port))
+        finally:
+            sock.close()
+
+    def test_all_addresses_dead(self):
+        addresses = [address(socket.AF_INET, "127.0.0.1", self.dead_port)]
+
+        with self.assertRaises(ConnectionRefusedError):
+            Resolver().race(addresses)
+
+    def test_connect_caches_addresses(self):
+        dns = Resolver()
+
+        for _ in range(2):
+            dns.connect("127.0.0.1", self.port).close()
+
+        stats = dns.stats()
+        self.assertEqual(stats["cache_hits"], 1)
+        self.assertEqual(stats["resolve"]["count"], 1)
+        self.assertEqual(stats["connect"]["count"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
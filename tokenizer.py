@@ -0,0 +1,133 @@
+import re
+
+
+TEXT = "text"
+TAG = "tag"
+
+# <script> / <style>, with or without attributes. Their content is dropped.
+SKIP_OPEN_RE = re.compile(r"<(script|style)\b[^>]*>", re.IGNORECASE)
+SKIP_CLOSE_RE = {
+    "script": re.compile(r"</script>", re.IGNORECASE),
+    "style": re.compile(r"</style>", re.IGNORECASE),
+}
+
+ATTRIBUTE_RE = re.compile(r"""([a-zA-Z_:-]+)\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))""")
+
+TITLE_OPEN_RE = re.compile(r"<title\b[^>]*>", re.IGNORECASE)
+TITLE_CLOSE_RE = re.compile(r"</title\s*>", re.IGNORECASE)
+
+
+class Tokenizer:
+    def __init__(self):
+        # Unfinished tag (or tail of skipped content) from the last chunk
+        self.buffer = ""
+        self.skip_until = None
+
+    def feed(self, chunk):
+        buf = self.buffer + chunk
+        pos = 0
+        n = len(buf)
+
+        try:
+            while pos < n:
+                if self.skip_until:
+                    end = self.skip_until.search(buf, pos)
+                    if not end:
+                        # Keep enough to match a closing tag split across chunks
+                        pos = max(pos, n - 8)
+                        break
+                    pos = end.end()
+                    self.skip_until = None
+                    continue
+
+                start = buf.find("<", pos)
+                if start == -1:
+                    yield (TEXT, buf[pos:])
+                    pos = n
+                    break
+
+                if start > pos:
+                    yield (TEXT, buf[pos:start])
+                    pos = start
+
+                end = buf.find(">", start + 1)
+                if end == -1:
+                    # Tag is split across chunks, wait for the rest
+                    break
+
+                tag = buf[start:end + 1]
+                pos = end + 1
+
+                opening = SKIP_OPEN_RE.match(tag)
+                if not opening:
+                    # A stray "<" just before <script> or <style> mustn't
+                    # swallow it, or the content would show up as text
+                    inner = tag.rfind("<", 1)
+                    if inner != -1:
+                        opening = SKIP_OPEN_RE.match(tag, inner)
+                        if opening:
+                            yield (TAG, tag[:inner])
+
+                if opening:
+                    self.skip_until = SKIP_CLOSE_RE[opening.group(1).lower()]
+                    continue
+
+                yield (TAG, tag)
+        finally:
+            self.buffer = buf[pos:]
+
+    def close(self):
+        # An unterminated "<..." at the very end still counts as a tag
+        if self.buffer and not self.skip_until:
+            yield (TAG, self.buffer)
+
+        self.buffer = ""
+        self.skip_until = None
+
+
+def tokenize(html):
+    tokenizer = Tokenizer()
+    yield from tokenizer.feed(html)
+    yield from tokenizer.close()
+
+
+def parse_attributes(tag):
+    attributes = {}
+    for name, double, single, bare in ATTRIBUTE_RE.findall(tag):
+        attributes[name.lower()] = double or single or bare
+    return attributes
+
+
+class TitleFinder:
+    # Picks the first <title> out of tokens as they go by, so nothing has
+    # to keep the token stream around for it
+    def __init__(self):
+        self.parts = None
+        self.found = None
+
+    def add(self, kind, value):
+        if self.found is not None:
+            return
+
+        if self.parts is None:
+            if kind == TAG and TITLE_OPEN_RE.match(value):
+                self.parts = []
+        elif kind == TAG and TITLE_CLOSE_RE.match(value):
+            self.found = " ".join("".join(self.parts).split())
+            self.parts = None
+        else:
+            self.parts.append(value)
+
+    def title(self):
+        return "Untitled Page" if self.found is None else self.found
+
+
+def title_from_tokens(tokens):
+    finder = TitleFinder()
+
+    for kind, value in tokens:
+        finder.add(kind, value)
+        if finder.found is not None:
+            break
+
+    return finder.title()